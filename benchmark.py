@@ -0,0 +1,507 @@
+# benchmark.py
+"""
+Offline benchmark for the scrape -> notify cycle.
+
+Serves listing pages, a Slack webhook, a translator and a Google Sheet from a local HTTP
+server, so no network, proxy or credentials are needed. Listings are recorded pages from
+bench_fixtures/ when present (see `record`), otherwise synthetic pages built with the same
+markup and JSON structure as the live sites.
+
+    python benchmark.py                       # default matrix, prints a table
+    python benchmark.py --cards 30 100 --history 1000 100000 --json bench.json
+    python benchmark.py --chrome              # also drive headless Chrome for Lancers
+    python benchmark.py record                # save live listing pages into bench_fixtures/
+
+Regression run before merging changes to scraping code: `python benchmark.py --chrome`.
+Every run first checks the JavaScript that browser.py runs in Chrome. With --chrome,
+LANCERS_CARDS_JS runs against a served listing and must return every card. Without it,
+the scripts are only compiled with node (when installed). Without --chrome, the Lancers
+parse figure times the card extraction with a stdlib HTML parser that mirrors
+LANCERS_CARDS_JS, plus parse_lancers_cards. It does not time the extraction in Chrome.
+"""
+import os
+import re
+import sys
+import json
+import time
+import html
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from urllib.parse import urlsplit, parse_qs
+import subprocess
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+
+WORDS = ["Webサイト制作", "システム開発", "AIチャットボット", "Androidアプリ", "LP作成", "保守運用",
+         "Python", "React", "WordPress", "スクレイピング", "業務効率化", "API連携"]
+
+
+def synthetic_titles(count, seed):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(WORDS)}の{rng.choice(WORDS)}と{rng.choice(WORDS)}{rng.choice(WORDS)}案件 #{seed}-{i}"
+        for i in range(count)
+    ]
+
+
+def lancers_listing_html(count, first_id):
+    """
+    A Lancers search page with `count` job cards using the live markup.
+    """
+    cards = []
+    for i, title in enumerate(synthetic_titles(count, first_id)):
+        jid = first_id + count - i  # newest first
+        badge = "コンペ" if i % 10 == 9 else "プロジェクト"
+        cards.append(
+            f'<div class="p-search-job-media c-media c-media--item" onclick="goToLjpWorkDetail({jid})">'
+            f'<div class="p-search-job-media__title c-media__title">\n  <span>NEW</span>\n  {html.escape(title)}\n</div>'
+            f'<span class="c-badge"><span class="c-badge__text">{badge}</span></span>'
+            f'<div class="p-search-job-media__price">'
+            f'<span class="p-search-job-media__number">{10000 + i * 1000:,}</span> ~ '
+            f'<span class="p-search-job-media__number">{50000 + i * 1000:,}</span></div></div>'
+        )
+    return (
+        '<html><head><title>Lancers</title></head><body>'
+        f'<div class="p-search-job-medias p-search-job-medias--lancer">{"".join(cards)}</div></body></html>'
+    )
+
+
+def cw_listing_data(count, first_id):
+    """
+    The decoded #vue-container data of a Crowdworks search page with `count` offers.
+    """
+    offers = []
+    for i, title in enumerate(synthetic_titles(count, first_id)):
+        if i % 3 == 0:
+            payment = {"hourly_payment": {"min_hourly_wage": 1500.0, "max_hourly_wage": 3000.0}}
+        else:
+            payment = {"fixed_price_payment": {"min_budget": 10000.0 + i, "max_budget": 50000.0 + i}}
+        offers.append({
+            "job_offer": {
+                "id": first_id + count - i,
+                "title": title,
+                "description_digest": "案件の説明 " * 20,
+                "last_released_at": time.strftime("%Y-%m-%dT%H:%M:%S+09:00"),
+            },
+            "payment": payment,
+            "client": {"username": f"client{i}", "is_employer_certification": bool(i % 2)},
+        })
+    return {"searchResult": {"job_offers": offers, "total_count": count}}
+
+
+def cw_listing_html(count, first_id):
+    data = html.escape(json.dumps(cw_listing_data(count, first_id), ensure_ascii=False), quote=True)
+    return (
+        '<html><head><title>Crowdworks</title><script>window.vueContainer = "vue-container";</script></head>'
+        f'<body><div id="vue-container" class="container" data="{data}"></div></body></html>'
+    )
+
+
+class LancersCardParser(HTMLParser):
+    """
+    Stdlib stand-in for browser.LANCERS_CARDS_JS: extracts the same card dicts from the
+    HTML of a Lancers search page, so listing parsing can be timed and checked without Chrome.
+    """
+
+    VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+    ROLES = {
+        "title": {"p-search-job-media__title", "c-media__title"},
+        "badge": {"c-badge__text"},
+        "price": {"p-search-job-media__price"},
+        "number": {"p-search-job-media__number"},
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cards = []
+        self._card = None
+        self._stack = []  # (tag, role) of the open elements inside the current card
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = set((attrs.get("class") or "").split())
+        if self._card is None:
+            if tag == "div" and {"p-search-job-media", "c-media", "c-media--item"} <= classes:
+                match = re.search(r"goToLjpWorkDetail\((\d+)\)", attrs.get("onclick") or "")
+                self._card = {"id": match.group(1) if match else None, "title": None, "badge": None,
+                              "numbers": [], "priceText": None}
+                self._stack = [(tag, None)]
+            return
+        if tag in self.VOID:
+            return
+        role = next((name for name, needed in self.ROLES.items() if needed <= classes), None)
+        if role == "number" and not any(r == "price" for _, r in self._stack):
+            role = None
+        if role in ("title", "badge", "price") and self._card[{"price": "priceText"}.get(role, role)] is not None:
+            role = None  # querySelector: the first match only
+        if role == "number":
+            self._card["numbers"].append("")
+        elif role:
+            self._card[{"price": "priceText"}.get(role, role)] = ""
+        self._stack.append((tag, role))
+
+    def handle_endtag(self, tag):
+        if self._card is None or tag in self.VOID:
+            return
+        while self._stack:
+            open_tag, _ = self._stack.pop()
+            if open_tag == tag:
+                break
+        if not self._stack:
+            card = self._card
+            card["badge"] = (card["badge"] or "").strip()
+            card["numbers"] = [n.strip() for n in card["numbers"]]
+            card["priceText"] = card["priceText"] or ""
+            self.cards.append(card)
+            self._card = None
+
+    def handle_data(self, data):
+        if self._card is None:
+            return
+        for _, role in self._stack:
+            if role == "number":
+                self._card["numbers"][-1] += data
+            elif role:
+                key = {"price": "priceText"}.get(role, role)
+                self._card[key] += data
+
+
+def extract_lancers_cards(page):
+    parser = LancersCardParser()
+    parser.feed(page)
+    parser.close()
+    return parser.cards
+
+
+def check_browser_scripts(services, use_chrome):
+    """
+    Fails the run if the JavaScript browser.py / readiness.py send to Chrome is broken:
+    with Chrome, LANCERS_CARDS_JS must return every card of a served listing; without
+    it, every script must at least compile under node.
+    """
+    import browser
+    import readiness
+
+    scripts = {f"browser.{name}": value for name, value in vars(browser).items() if name.endswith("_JS")}
+    scripts.update({f"readiness.{name}": value for name, value in vars(readiness).items() if name.endswith("_JS")})
+    if shutil.which("node"):
+        for name, script in scripts.items():
+            result = subprocess.run(["node", "-e", f"new Function({json.dumps(script)})"],
+                                    capture_output=True, text=True)
+            if result.returncode:
+                lines = result.stderr.strip().splitlines()
+                raise SystemExit(f"{name} does not compile: {next((l for l in lines if 'Error' in l), lines[-1])}")
+    elif not use_chrome:
+        print("⚠️ node not found and --chrome not given, browser scripts are not checked")
+
+    if use_chrome:
+        driver = browser.init_driver()
+        try:
+            driver.get(f"{services.base_url}/lancers/Lancers_check")
+            cards = driver.execute_script(browser.LANCERS_CARDS_JS)
+        finally:
+            driver.quit()
+        expected = extract_lancers_cards(services.listing("lancers", "Lancers_check"))
+        if [card["id"] for card in cards] != [card["id"] for card in expected]:
+            raise SystemExit(f"LANCERS_CARDS_JS returned {len(cards)} cards, expected {len(expected)}")
+
+
+class FakeServices:
+    """
+    Local stand-ins for the listing sites, the Slack webhook, the translator and Sheets.
+    """
+
+    def __init__(self, cards=30, first_id=1_000_000):
+        self.cards = cards
+        self.first_id = first_id
+        self.slack_posts = 0
+        self.sheet_rows = 0
+        self.translate_calls = 0
+        self.sources = {}  # dtype -> index, so every source lists its own ids
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def listing(self, site, dtype):
+        recorded = os.path.join(FIXTURES_DIR, f"{dtype}.html")
+        if os.path.exists(recorded):
+            with open(recorded, "r", encoding="utf-8") as f:
+                return f.read()
+        with self.lock:
+            first_id = self.first_id + self.sources.setdefault(dtype, len(self.sources)) * self.cards
+        if site == "lancers":
+            return lancers_listing_html(self.cards, first_id)
+        return cw_listing_html(self.cards, first_id)
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, body, content_type="text/html; charset=utf-8"):
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                _, site, dtype = (parts.path.split("/") + ["", ""])[:3]
+                page = int(parse_qs(parts.query).get("page", ["1"])[0])
+                if site in ("lancers", "cw"):
+                    # Only page 1 has jobs, deeper pages are empty
+                    if page == 1:
+                        self._reply(services.listing(site, dtype))
+                    else:
+                        self._reply(lancers_listing_html(0, 0) if site == "lancers" else cw_listing_html(0, 0))
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with services.lock:
+                    if self.path == "/slack":
+                        services.slack_posts += 1
+                        self._reply("ok", "text/plain")
+                        return
+                    if self.path == "/sheets":
+                        services.sheet_rows += len(body["rows"])
+                        self._reply("{}", "application/json")
+                        return
+                    if self.path == "/translate":
+                        services.translate_calls += 1
+                        text = "\n".join(f"EN {line}" for line in body["text"].split("\n"))
+                        self._reply(json.dumps({"text": text}), "application/json")
+                        return
+                self.send_response(404)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def install_stubs(services):
+    """
+    Points the bot's sinks at the local services. Must run before bot modules are imported.
+    """
+    os.environ["SLACK_WEBHOOK_URL"] = f"{services.base_url}/slack"
+    os.environ["SLACK_BATCH_WINDOW"] = "0.2"
+    os.environ["GOOGLE_SHEET_URL"] = f"{services.base_url}/sheet"
+    os.environ["SHEET_FLUSH_SECONDS"] = "0.5"
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["CW_FETCH_MODE"] = "http"
+    # The local services are not rate limited, keep the host budgets out of the timings
+    os.environ["LANCERS_REQUESTS_PER_MINUTE"] = "100000"
+    os.environ["CW_REQUESTS_PER_MINUTE"] = "100000"
+    for key in ("proxy_address", "proxy_username", "proxy_password"):
+        os.environ.pop(key, None)
+
+    import requests
+    import translate
+    import update_sheet
+
+    class FakeTranslator:
+        def __init__(self, source="ja", target="en"):
+            pass
+
+        def translate(self, text):
+            resp = requests.post(f"{services.base_url}/translate", json={"text": text}, timeout=10)
+            return resp.json()["text"]
+
+    class FakeWorksheet:
+        def append_rows(self, rows, value_input_option=None):
+            requests.post(f"{services.base_url}/sheets", json={"rows": rows}, timeout=10)
+
+    translate.GoogleTranslator = FakeTranslator
+    update_sheet.SheetWriter._worksheet = lambda self: FakeWorksheet()
+
+
+def measure(fn, repeat):
+    """
+    Best-of-`repeat` wall time of fn() in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parsing(cards, repeat):
+    import browser
+
+    cw_page = cw_listing_html(cards, 1_000_000)
+    lancers_page = lancers_listing_html(cards, 1_000_000)
+
+    def parse_cw():
+        browser.parse_cw_data(json.loads(browser.extract_cw_data_attribute(cw_page)), "CW_bench")
+
+    def parse_lancers():
+        browser.parse_lancers_cards(extract_lancers_cards(lancers_page), "Lancers_bench")
+
+    quiet = open(os.devnull, "w")
+    stdout, sys.stdout = sys.stdout, quiet
+    try:
+        cw = measure(parse_cw, repeat)
+        lancers = measure(parse_lancers, repeat)
+    finally:
+        sys.stdout = stdout
+        quiet.close()
+    return {"cw_parse_us_per_card": cw / cards * 1e6, "lancers_parse_us_per_card": lancers / cards * 1e6}
+
+
+def bench_cycle(services, cards, history, use_chrome):
+    """
+    Runs one burst cycle (every job new) and one quiet cycle (nothing changed) through
+    job_check and returns timing and memory figures.
+    """
+    import bot
+    import browser
+    import notifySlack
+    import sources
+    import update_sheet
+    from change_detect import ListingFingerprints
+    from driver_pool import DriverPool
+    from pipeline import JobPipeline
+    from seen_store import SeenStore
+
+    services.cards = cards
+    services.first_id += 100 * cards  # fresh ids for every scenario
+    sources.adapters()
+    sources.REGISTRY["cw"].urls = {f"CW_bench{i}": f"{services.base_url}/cw/CW_bench{i}" for i in range(4)}
+    sources.REGISTRY["lancers"].urls = (
+        {f"Lancers_bench{i}": f"{services.base_url}/lancers/Lancers_bench{i}" for i in range(4)} if use_chrome else {}
+    )
+    bot.fingerprints = ListingFingerprints()
+
+    seen = SeenStore(f"seen-{cards}-{history}.db", legacy_file=None)
+    seen.add_many({"dtype": "CW_history", "id": str(i), "title": "old"} for i in range(history))
+    pool = DriverPool(lambda site, slot: browser.init_driver(), {"lancers": 2, "cw": 1})
+    notifySlack._dispatcher = None
+    update_sheet._writer = None
+    pipeline = JobPipeline(seen)
+
+    def cycle(index):
+        bot.job_check(pool, index, seen, pipeline)
+        notifySlack.get_dispatcher().flush(60)
+        update_sheet.get_sheet_writer().flush()
+
+    quiet = open(os.devnull, "w")
+    stdout, sys.stdout = sys.stdout, quiet
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        cycle(0)
+        burst = time.perf_counter() - start
+        new_jobs = len(seen) - history
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        cycle(1)
+        quiet_cycle = time.perf_counter() - start
+    finally:
+        sys.stdout = stdout
+        quiet.close()
+        pool.quit_all()
+        seen.close()
+
+    return {
+        "burst_cycle_s": burst,
+        "quiet_cycle_s": quiet_cycle,
+        "peak_mem_mib": peak / 2**20,
+        "new_jobs": new_jobs,
+    }
+
+
+def record(args):
+    """
+    Saves the live listing pages of every source into bench_fixtures/ (needs network).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    import browser
+    from http_fetch import fetch_html
+    from sources import REGISTRY, adapters
+
+    adapters()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for dtype, url in REGISTRY["cw"].urls.items():
+        with open(os.path.join(FIXTURES_DIR, f"{dtype}.html"), "w", encoding="utf-8") as f:
+            f.write(fetch_html(url))
+        print(f"Recorded {dtype}")
+    driver = browser.init_driver()
+    try:
+        for dtype, url in REGISTRY["lancers"].urls.items():
+            driver.get(url)
+            time.sleep(5)
+            with open(os.path.join(FIXTURES_DIR, f"{dtype}.html"), "w", encoding="utf-8") as f:
+                f.write(driver.page_source)
+            print(f"Recorded {dtype}")
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "record"])
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 30, 100], help="cards per listing page")
+    parser.add_argument("--history", type=int, nargs="+", default=[1_000, 100_000], help="jobs already in the seen store")
+    parser.add_argument("--repeat", type=int, default=20, help="repetitions for the parse micro-benchmarks")
+    parser.add_argument("--chrome", action="store_true", help="also scrape Lancers fixtures with headless Chrome")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args)
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp(prefix="jobbot-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # keep databases and spools out of the working tree
+    services = FakeServices()
+    install_stubs(services)
+
+    results = []
+    try:
+        check_browser_scripts(services, args.chrome)
+        for cards in args.cards:
+            parsing = bench_parsing(cards, args.repeat)
+            for history in args.history:
+                row = {"cards": cards, "history": history, **parsing, **bench_cycle(services, cards, history, args.chrome)}
+                results.append(row)
+                print(
+                    f"cards={cards:>4} history={history:>7} | "
+                    f"parse cw {row['cw_parse_us_per_card']:7.1f}us/card lancers {row['lancers_parse_us_per_card']:6.1f}us/card | "
+                    f"burst {row['burst_cycle_s']:6.2f}s ({row['new_jobs']} jobs) quiet {row['quiet_cycle_s']:6.2f}s | "
+                    f"peak {row['peak_mem_mib']:6.1f} MiB"
+                )
+        print(f"Slack posts: {services.slack_posts}, sheet rows: {services.sheet_rows}, translate calls: {services.translate_calls}")
+    finally:
+        services.stop()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
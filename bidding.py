@@ -0,0 +1,263 @@
+# bidding.py
+import os
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from seen_store import site_of
+from sources import adapter_for, adapters
+import eventlog
+import metrics
+
+
+def bid_config_from_env():
+    return {
+        # Jobs scoring less than this in rules.json are not bid on
+        "min_score": float(os.getenv("BID_MIN_SCORE", "1")),
+        # Jobs whose proposal is being written / form is loading at the same time
+        "workers": max(1, int(os.getenv("BID_WORKERS", "4"))),
+        # Ready proposals waiting to be sent, each holds a tab with its form open
+        "queue_size": max(1, int(os.getenv("BID_QUEUE_SIZE", "4"))),
+        # Jobs waiting for a free bid worker, more are dropped
+        "backlog": max(1, int(os.getenv("BID_BACKLOG", "16"))),
+        # Jobs remembered as already bid on
+        "history": max(1, int(os.getenv("BID_HISTORY", "10000"))),
+        "form_timeout": float(os.getenv("BID_FORM_TIMEOUT", "15")),
+        "proposal_timeout": float(os.getenv("BID_PROPOSAL_TIMEOUT", "30")),
+        # Fill in the form but do not press send (for measuring the fast path)
+        "dry_run": os.getenv("BID_DRY_RUN", "0") == "1",
+        "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        "max_tokens": int(os.getenv("BID_MAX_TOKENS", "600")),
+        # Who we are and what we offer, added to the prompt
+        "profile_file": os.getenv("BID_PROFILE_FILE", "bid_profile.txt"),
+        # Fallback proposal with {title}, {price} and {url} placeholders
+        "template_file": os.getenv("BID_TEMPLATE_FILE", "bid_template.txt"),
+    }
+
+
+def _read(path):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    return ""
+
+
+class ProposalWriter:
+    """
+    Writes the proposal text for a job with the OpenAI API (when OPENAI_API_KEY is set),
+    falling back to the template in BID_TEMPLATE_FILE. The client is created once and
+    shared by the bidder's threads.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.profile = _read(config["profile_file"])
+        self.template = _read(config["template_file"])
+        self.client = None
+        if os.getenv("OPENAI_API_KEY"):
+            # Imported here: the bot runs without the openai package when bidding is off
+            from openai import OpenAI
+
+            self.client = OpenAI(timeout=config["proposal_timeout"], max_retries=1)
+
+    def available(self) -> bool:
+        return bool(self.client or self.template)
+
+    def _from_template(self, job):
+        values = {"title": job["title"], "price": job["price"], "url": job["url"]}
+        try:
+            return self.template.format(**values)
+        except (KeyError, IndexError, ValueError) as e:
+            # Stray braces in the template: fill in the known placeholders only
+            logging.warning(f"⚠️ {self.config['template_file']} is not a valid template ({e!r}), "
+                            f"filling in the placeholders as plain text")
+            text = self.template
+            for key, value in values.items():
+                text = text.replace("{" + key + "}", str(value))
+            return text
+
+    def write(self, job, description):
+        if self.client is None:
+            return self._from_template(job)
+        try:
+            with metrics.timer("proposal", job["dtype"]):
+                response = self.client.chat.completions.create(
+                    model=self.config["model"],
+                    max_tokens=self.config["max_tokens"],
+                    messages=[
+                        {"role": "system", "content": (
+                            "You write short, specific proposals in polite Japanese for freelance job postings "
+                            "on Lancers. Reply with the proposal text only.\n\n" + self.profile
+                        )},
+                        {"role": "user", "content": (
+                            f"Title: {job['title']}\nBudget: {job['price']}\n\n{description or ''}"
+                        )},
+                    ],
+                )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            if not self.template:
+                raise
+            logging.error(f"⚠️ Proposal generation failed for {job['dtype']} {job['id']}, using the template: {e}")
+            return self._from_template(job)
+
+
+class Bidder:
+    """
+    Fast path from a detected job to a sent proposal.
+
+    The pipeline hands every job that passed the filters to consider(). Jobs scoring at
+    least BID_MIN_SCORE get a bid: as soon as the prefetched detail page is in, the
+    proposal is written on one thread while a warm, logged-in tab of the adapter's
+    `bid_site` opens the proposal form. The tab, with the form loaded, and the proposal
+    then go through a bounded queue to a single sender, which fills in and submits the
+    form in one round trip. When the queue is full, or BID_BACKLOG jobs are already
+    waiting for a bid worker, the bid is dropped rather than sent late.
+
+    Every bid records how long each step took and the time from detection (when the
+    listing was fetched) to sent, in the `bid_seconds` histogram and a `bid_sent` event.
+    """
+
+    def __init__(self, pool, prefetcher, writer=None, config=None):
+        self.pool = pool
+        self.prefetcher = prefetcher
+        self.config = dict(config or bid_config_from_env())
+        self.writer = writer or ProposalWriter(self.config)
+        self._prepare = ThreadPoolExecutor(max_workers=self.config["workers"], thread_name_prefix="bid")
+        self._proposals = ThreadPoolExecutor(max_workers=self.config["workers"], thread_name_prefix="proposal")
+        self._backlog = threading.BoundedSemaphore(self.config["workers"] + self.config["backlog"])
+        self._ready = queue.Queue(maxsize=self.config["queue_size"])
+        self._started = OrderedDict()  # (site, id) of jobs already bid on -> None, oldest first
+        self._lock = threading.Lock()
+        threading.Thread(target=self._send_loop, name="bid-sender", daemon=True).start()
+
+    def qualifies(self, job) -> bool:
+        adapter = adapter_for(job["dtype"])
+        return (bool(adapter.bid_sessions) and adapter.bid_site in self.pool.limits
+                and self.prefetcher.supports(job) and (job.get("score") or 0) >= self.config["min_score"])
+
+    def warm(self):
+        """
+        Opens and logs in every bid tab up front, so the first bid does not pay for it.
+        """
+        for adapter in adapters():
+            if adapter.bid_site in self.pool.limits:
+                drivers = [self.pool.acquire(adapter.bid_site) for _ in range(self.pool.limits[adapter.bid_site])]
+                for driver in drivers:
+                    self.pool.release(adapter.bid_site, driver)
+
+    def consider(self, job):
+        """
+        Starts bidding on a job if it qualifies. Never blocks.
+        """
+        if not self.qualifies(job):
+            return
+        key = (site_of(job["dtype"]), str(job["id"]))
+        with self._lock:
+            if key in self._started:
+                return
+            self._started[key] = None
+            while len(self._started) > self.config["history"]:
+                self._started.popitem(last=False)
+        if not self._backlog.acquire(blocking=False):
+            metrics.incr("bids_dropped", job["dtype"])
+            logging.warning(f"⚠️ Bid workers busy, dropping the bid for {job['dtype']} {job['id']}")
+            return
+        timings = {"detected": job.get("found_ts") or time.time(), "considered": time.time()}
+        self._prepare.submit(self._prepare_bid, job, timings).add_done_callback(lambda _: self._backlog.release())
+
+    def _release(self, site, driver, failed=False):
+        if failed and self.pool.health_check and not self.pool.health_check(driver):
+            self.pool.discard(site, driver)
+        else:
+            self.pool.release(site, driver)
+
+    def _prepare_bid(self, job, timings):
+        adapter = adapter_for(job["dtype"])
+        try:
+            detail = self.prefetcher.detail(job) or {}
+            timings["detail"] = time.time()
+            if not detail.get("apply_url"):
+                metrics.incr("bids_skipped", job["dtype"])
+                logging.info(f"🙅 No proposal form for {job['dtype']} {job['id']}, not bidding")
+                return
+
+            # Write the proposal while the form loads
+            proposal = self._proposals.submit(self.writer.write, job, detail.get("description"))
+            driver = self.pool.acquire(adapter.bid_site)
+            timings["tab"] = time.time()
+        except Exception as e:
+            metrics.incr("bid_errors", job["dtype"])
+            logging.error(f"⚠️ Could not prepare a bid for {job['dtype']} {job['id']}: {e}")
+            return
+
+        try:
+            adapter.budget.take()
+            adapter.open_bid_form(driver, detail["apply_url"], self.config["form_timeout"])
+            timings["form"] = time.time()
+            text = proposal.result(timeout=self.config["proposal_timeout"])
+            timings["proposal"] = time.time()
+            # The tab travels with the bid, the sender releases it
+            self._ready.put_nowait((job, driver, text, timings))
+        except queue.Full:
+            metrics.incr("bids_dropped", job["dtype"])
+            logging.warning(f"⚠️ Bid queue full, dropping the bid for {job['dtype']} {job['id']}")
+            self._release(adapter.bid_site, driver)
+        except Exception as e:
+            metrics.incr("bid_errors", job["dtype"])
+            logging.error(f"⚠️ Could not prepare a bid for {job['dtype']} {job['id']}: {e}")
+            self._release(adapter.bid_site, driver, failed=True)
+
+    def _send_loop(self):
+        while True:
+            job, driver, text, timings = self._ready.get()
+            adapter = adapter_for(job["dtype"])
+            failed = False
+            try:
+                timings["dequeued"] = time.time()
+                # A dry run fills in the form too, only the send button is left alone
+                adapter.send_bid(driver, text, submit=not self.config["dry_run"])
+                timings["sent"] = time.time()
+                self._record(job, timings)
+            except Exception as e:
+                failed = True
+                metrics.incr("bid_errors", job["dtype"])
+                logging.error(f"❌ Could not send the bid for {job['dtype']} {job['id']}: {e}")
+            finally:
+                self._release(adapter.bid_site, driver, failed)
+
+    def _record(self, job, timings):
+        dtype = job["dtype"]
+        total = timings["sent"] - timings["detected"]
+        steps, previous = {}, timings["detected"]
+        for step in ("considered", "detail", "tab", "form", "proposal", "dequeued", "sent"):
+            steps[step] = round(timings[step] - previous, 3)
+            previous = timings[step]
+        metrics.incr("bids_sent", dtype)
+        metrics.observe("bid_seconds", dtype, total)
+        eventlog.event("bid_sent", dtype=dtype, id=job["id"], url=job["url"], seconds=round(total, 3), steps=steps,
+                       dry_run=self.config["dry_run"])
+        logging.info(f"📝 {'Dry-run bid' if self.config['dry_run'] else 'Bid'} on {dtype} {job['id']} sent "
+                     f"{total:.1f}s after detection "
+                     f"({', '.join(f'{step} {seconds:.1f}s' for step, seconds in steps.items())})")
+
+    def stop(self):
+        self._prepare.shutdown(wait=False, cancel_futures=True)
+        self._proposals.shutdown(wait=False, cancel_futures=True)
+
+
+def bidder_from_env(pool, prefetcher):
+    """
+    A Bidder if some adapter has bid sessions (e.g. BID_SESSIONS_LANCERS=1), else None.
+    """
+    if not any(adapter.bid_site in pool.limits for adapter in adapters()):
+        return None
+    config = bid_config_from_env()
+    writer = ProposalWriter(config)
+    if not writer.available():
+        logging.warning(f"⚠️ Bid sessions are configured but neither OPENAI_API_KEY nor {config['template_file']} "
+                        f"is available, not bidding")
+        return None
+    return Bidder(pool, prefetcher, writer, config)
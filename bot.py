@@ -1,126 +1,132 @@
-import os, time, json, schedule, logging, traceback
-from browser import get_lancers_jobs, get_cw_jobs, get_description, submit_bid
+import startup  # first, so the startup report covers our imports
 from dotenv import load_dotenv
-from browser import login
-from notifySlack import notify_slack
-from translate import translate_to_english, is_japanese_text
-from update_sheet import update_google_sheet
-from selenium.webdriver import ChromeOptions
-from selenium.webdriver.common.proxy import Proxy, ProxyType
-from selenium.webdriver import Chrome
-
-TARGET_URLS_Lancers = {
-    "Lancers_web":    "https://www.lancers.jp/work/search/web?open=1",
-    "Lancers_system": "https://www.lancers.jp/work/search/system?open=1",
-    "Lancers_AI":     "https://www.lancers.jp/work/search/system/ai?open=1",
-    "Lancers_Android": "https://www.lancers.jp/work/search/system/smartphoneapp?open=1"
-}
-
-TARGET_URLS_CW = {
-    "CW_web": "https://crowdworks.jp/public/jobs/search?category_id=230&order=new",
-    "CW_system": "https://crowdworks.jp/public/jobs/search?category_id=226&order=new",
-    "CW_AI": "https://crowdworks.jp/public/jobs/search?category_id=311&order=new",
-    "CW_Android": "https://crowdworks.jp/public/jobs/search?category_id=242&order=new"
-}
-
-if not os.path.exists('seen.json'):
-    with open('seen.json','w') as f: f.write('[]')
-
-def load_seen():
-    if not os.path.exists("seen.json"):
-        return [] 
-
-    with open("seen.json", "r", encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-            return data  # adjust based on your structure
-        except json.JSONDecodeError:
-            return []  # fallback for empty or invalid JSON
-
-def save_seen(data):
-    with open("seen.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-def job_check(driver, index):  
-    print(f"{index} Checking for new jobs...")
-    seen = load_seen()
-
-    new = []
-    # Get Lancers jobs with error handling
-    for dtype, url in TARGET_URLS_Lancers.items():
-        try:
-            jobs = get_lancers_jobs(driver, url, dtype)
-            new.extend(jobs)
-        except Exception as e:
-            print(f"⚠️ Error fetching {dtype} jobs: {e}")
-            logging.error(f"⚠️ Error fetching {dtype} jobs: {e}")
-            continue
-    
-    # Get Crowdworks jobs with error handling
-    for dtype, url in TARGET_URLS_CW.items():
+load_dotenv()  # once, before any module reads its settings
+import os, time, schedule, logging, threading, argparse, socket
+from concurrent.futures import ThreadPoolExecutor
+from sources import all_sources, adapter_for, adapter_for_site, session_limits
+from seen_store import SeenStore
+from history import HistoryStore
+from pipeline import JobPipeline
+from prefetch import DetailPrefetcher
+from bidding import bidder_from_env
+from cluster import (Coordinator, CoordinatorClient, LocalClient, RemoteSeen, ReportingPipeline, Worker,
+                     cluster_config_from_env)
+from driver_pool import DriverPool
+from supervisor import profile_dir, is_healthy, quit_quietly
+from change_detect import ListingFingerprints
+import metrics
+import eventlog
+import lean_mode
+from scheduler import AdaptiveScheduler
+from readiness import TIMEOUTS
+
+# Imported lazily by the pipeline, preloaded in the background while Chrome starts
+SINK_MODULES = ["translate", "notifySlack", "update_sheet"]
+# Seconds between the compact console summaries (found / new / notified / errors)
+SUMMARY_INTERVAL = int(os.getenv("SUMMARY_INTERVAL", "60"))
+
+startup.mark("imports")
+
+fingerprints = ListingFingerprints()
+
+def crawl_options(seen, dtype):
+    """
+    Paging options for a source: skip it entirely if its first page is unchanged since
+    the last cycle, otherwise walk up to MAX_PAGES newest-first pages until a known job
+    is reached. Sources without a watermark yet only read the first page. Every page
+    load takes a token from the host's request budget.
+    """
+    options = {
+        "changed": lambda jobs: fingerprints.changed(dtype, jobs),
+        "throttle": adapter_for(dtype).budget.take,
+    }
+    if seen.get_watermark(dtype) is not None:
+        options["known"] = lambda jid: seen.is_known(dtype, jid)
+        options["max_pages"] = max(1, int(os.getenv("MAX_PAGES", "5")))
+    return options
+
+def fetch_source(pool, seen, dtype):
+    """
+    Fetches a source with its adapter's fetch modes in order (e.g. HTTP, then Chrome).
+    Returns None if every mode failed.
+    """
+    adapter = adapter_for(dtype)
+    url = adapter.urls[dtype]
+    for mode in adapter.fetch_modes:
         try:
-            jobs = get_cw_jobs(driver, url, dtype)
-            new.extend(jobs)
+            if mode == "http":
+                jobs = adapter.fetch_http(url, dtype, **crawl_options(seen, dtype))
+            else:
+                with pool.session(adapter.name) as driver:
+                    jobs = adapter.fetch_browser(driver, url, dtype, **crawl_options(seen, dtype))
         except Exception as e:
-            print(f"⚠️ Error fetching {dtype} jobs: {e}")
-            logging.error(f"⚠️ Error fetching {dtype} jobs: {e}")
-            continue
-
-    jobs_to_update = []  # Collect jobs to send to Google Sheets
-    added_job_ids = set()  # Track job IDs to prevent duplicates
-
-    for job in new:
-        dtype, jid, job_type, title, price, url = job["dtype"], job["id"], job["type"], job["title"], job["price"], job["url"]
-
-        if not any(item["id"] == jid for item in seen) and jid not in added_job_ids:
-            if is_japanese_text(title):
-                title = translate_to_english(title)
-            print("✨NEW JOB✨")
-            print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"Type: {dtype}")
-            print(f"ID: {jid}")
-            print(f"Price: {price}")
-            print(f"Job Type: {job_type}")
-            print(f"Title: {title}")
-            print(f"URL: {url}")
-            print("-----------------------------------------------")
-            
-            notify_slack(dtype, price, title, url)
-
-            # Add job to the list for Google Sheets
-            jobs_to_update.append({
-                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "dtype": dtype,
-                "url": url,
-                "price": price,
-                "title": title,
-            })
-
-            # Add job to the seen list
-            seen.append({
-                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "dtype": dtype, 
-                "id": jid, 
-                "type": job_type,
-                "title": title, 
-                "url": url,
-                "price": price,
-            })
-
-            # Mark this job ID as added
-            added_job_ids.add(jid)
-
-    # Save seen jobs
-    save_seen(seen)
-
-    # Update Google Sheets with new jobs (only send new ones, not all seen jobs)
-    if jobs_to_update:
-        print(f"Updating Google Sheets with {len(jobs_to_update)} jobs...")
-        update_google_sheet(jobs_to_update)
-    else:
-        print("No new jobs to update in Google Sheets.")
-
-    print(f"{index} checked")
+            logging.error(f"⚠️ Error fetching {dtype} jobs ({mode}): {e}")
+            # The first page may already be fingerprinted, make sure the next mode reads it again
+            fingerprints.forget(dtype)
+            jobs = None
+        if jobs is not None:
+            return jobs
+        if mode != adapter.fetch_modes[-1]:
+            logging.info(f"↩️ Falling back from {mode} for {dtype}")
+    return None
+
+def scrape(pool, seen, dtype):
+    """
+    Fetches one source. Returns None on failure.
+    """
+    with metrics.timer("scrape", dtype):
+        jobs = fetch_source(pool, seen, dtype)
+    if jobs is None:
+        metrics.incr("scrape_errors", dtype)
+        return None
+    found_ts = time.time()
+    for job in jobs:
+        job["found_ts"] = found_ts
+    metrics.incr("jobs_found", dtype, len(jobs))
+    return jobs
+
+def check_source(pool, seen, pipeline, dtype):
+    """
+    One independent poll of a single source: its jobs are streamed into the pipeline as
+    soon as it returns. Returns the number of new jobs, or None if the source could not
+    be fetched.
+    """
+    try:
+        jobs = scrape(pool, seen, dtype)
+        if jobs is None:
+            fingerprints.forget(dtype)
+            return None
+        new_jobs = pipeline.submit(jobs)
+    except Exception:
+        # The first page may already be fingerprinted, make sure the next poll reads it again
+        fingerprints.forget(dtype)
+        raise
+    # Only once the jobs are handed over, so paging still reaches them if that failed
+    seen.update_watermark(dtype, jobs)
+    return new_jobs
+
+def job_check(pool, index, seen, pipeline):
+    """
+    Checks every source once, concurrently, and waits until all new jobs are published.
+    """
+    logging.debug(f"{index} Checking for new jobs...")
+
+    dtypes = list(all_sources())
+    with ThreadPoolExecutor(max_workers=pool.total_limit()) as executor:
+        new_jobs = sum(count or 0 for count in executor.map(lambda dtype: check_source(pool, seen, pipeline, dtype), dtypes))
+
+    pipeline.drain()
+    if not new_jobs:
+        logging.debug("No new jobs found.")
+
+    print_skip_rates()
+    logging.debug(f"{index} checked")
+
+def print_skip_rates():
+    skip_rates = metrics.skip_rates()
+    if skip_rates:
+        eventlog.event("skip_rates", message="Unchanged listing skip rate: " + ", ".join(
+            f"{dtype} {rate:.0%}" for dtype, rate in sorted(skip_rates.items())), rates=skip_rates)
 
 def create_proxy_auth_extension(proxy_address, username, password):
     """
@@ -179,17 +185,27 @@ def create_proxy_auth_extension(proxy_address, username, password):
     );
     """
 
-    # Create the extension file
-    plugin_file = "proxy_auth_plugin.zip"
-    with zipfile.ZipFile(plugin_file, "w") as zp:
+    # Create the extension file, unless the one from the last launch is still current
+    plugin_file = os.getenv("PROXY_PLUGIN_FILE", "proxy_auth_plugin.zip")
+    try:
+        with zipfile.ZipFile(plugin_file) as zp:
+            if (zp.read("manifest.json").decode() == manifest_json
+                    and zp.read("background.js").decode() == background_js):
+                return plugin_file
+    except (OSError, KeyError, zipfile.BadZipFile):
+        pass
+    tmp = plugin_file + ".tmp"
+    with zipfile.ZipFile(tmp, "w") as zp:
         zp.writestr("manifest.json", manifest_json)
         zp.writestr("background.js", background_js)
+    os.replace(tmp, plugin_file)  # sessions starting in parallel never see a half-written zip
 
     return plugin_file
 
-def init_driver_with_proxy():
+def init_driver_with_proxy(user_data_dir=None):
     """
     Initializes the Selenium WebDriver with proxy settings from the .env file.
+    A persistent user_data_dir keeps cookies and cache across browser restarts.
     """
     # Load proxy details from .env
     proxy_address = os.getenv("proxy_address")
@@ -199,62 +215,182 @@ def init_driver_with_proxy():
     if not proxy_address or not proxy_username or not proxy_password:
         raise ValueError("Proxy details are missing in the .env file.")
 
+    from selenium.webdriver import Chrome, ChromeOptions
+
     # Chrome options
     chrome_options = ChromeOptions()
     chrome_options.add_argument(f"--proxy-server=http://{proxy_address}")
+    # Skip first-run work, profiles are reused across launches
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--no-default-browser-check")
     chrome_options.add_argument("--ignore-certificate-errors")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    if user_data_dir:
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
 
     # Add proxy authentication extension
     plugin_file = create_proxy_auth_extension(proxy_address, proxy_username, proxy_password)
     chrome_options.add_extension(plugin_file)
 
+    # Opt-in lean mode blocks images, fonts, styles and trackers through CDP
+    lean_mode.apply_options(chrome_options)
+
     # Initialize WebDriver
     driver = Chrome(options=chrome_options)
+    driver.set_page_load_timeout(TIMEOUTS.config["page_load_timeout"])  # each fetch then uses its learned timeout
+    lean_mode.enable(driver)
     return driver
 
-def main():
-    load_dotenv()
-    # logging.basicConfig(filename='bidbot.log', level=logging.INFO, format='%(asctime)s %(message)s')
+def make_pool():
+    def new_session(site, slot):
+        # Use the proxy-enabled driver with a persistent profile per pool slot
+        driver = init_driver_with_proxy(profile_dir(site, slot))
+        try:
+            adapter_for_site(site).prepare_session(driver)
+        except Exception:
+            driver.quit()
+            raise
+        return driver
+
+    # Dead or hung browsers are restarted on their own, the process and its queues stay up
+    return DriverPool(new_session, session_limits(), health_check=is_healthy, discard=quit_quietly)
+
+def make_scheduler(pool, seen, pipeline, sources):
+    polled = set()
+
+    def run_source(dtype):
+        new_jobs = check_source(pool, seen, pipeline, dtype)
+        # The first time every source has been polled, print how long startup took
+        polled.add(dtype)
+        if polled >= set(scheduler.sources):
+            startup.report()
+        return new_jobs
+
+    scheduler = AdaptiveScheduler(
+        run_source, sources, max_workers=max(1, len(all_sources())),
+        budget_for=lambda dtype: adapter_for(dtype).budget,
+    )
+    return scheduler
+
+def start_worker(pool, client):
+    """
+    Starts polling whatever the coordinator assigns to this worker. Dedup, translation
+    and publishing happen on the coordinator.
+    """
+    seen = RemoteSeen()
+    scheduler = make_scheduler(pool, seen, ReportingPipeline(client, seen), [])
+    worker = Worker(client, scheduler, seen, capacity=pool.total_limit(),
+                    info={"proxy": (os.getenv("proxy_address") or "").split(":")[0]})
+    worker.heartbeat()
+    threading.Thread(target=worker.run_heartbeats, name="worker-heartbeat", daemon=True).start()
+    threading.Thread(target=scheduler.run_forever, name="scheduler", daemon=True).start()
+    return worker, scheduler
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lancers / Crowdworks job bot")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--coordinator", action="store_true",
+                      help="assign sources to workers and publish what they report")
+    mode.add_argument("--worker", metavar="URL", help="scrape the sources assigned by the coordinator at URL")
+    parser.add_argument("--worker-id", default=os.getenv("WORKER_ID"), help="defaults to <hostname>-<pid>")
+    parser.add_argument("--env-file", help="extra .env file, e.g. with this worker's proxy credentials")
+    parser.add_argument("--fast-start", action="store_true", default=os.getenv("FAST_START") == "1",
+                        help="start polling right away and log in to Lancers in the background")
+    return parser.parse_args()
 
+def main():
+    args = parse_args()
+    if args.env_file:
+        load_dotenv(args.env_file, override=True)
+    # Log records are queued and written by a background thread (logs/jobbot.jsonl + console)
+    eventlog.setup_logging()
+    startup.mark("config")
+
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    if args.worker:
+        # Several workers on one host need their own profiles and proxy extension
+        os.environ.setdefault("CHROME_PROFILE_ROOT", os.path.join("chrome_profiles", worker_id))
+        os.environ.setdefault("PROXY_PLUGIN_FILE", f"proxy_auth_plugin_{worker_id}.zip")
+        # ... and their own metrics port: off unless METRICS_PORT is set for this worker
+        os.environ.setdefault("METRICS_PORT", "0")
+
+    pool = make_pool()
+    worker = None
     try:
-        driver = init_driver_with_proxy()  # Use the proxy-enabled driver
-        login(driver, os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASS"))
-
-        index = [0]  # using a list to hold the mutable index
-
-        def scheduled_job():
-            try:
-                job_check(driver, index)
-                index[0] += 1  # increment after each run
-            except Exception as e:
-                print(f"❌ Error in scheduled job: {e}")
-                traceback.print_exc()
-                logging.error(f"❌ Error in scheduled job: {e}")
-                driver.quit()
-                os._exit(1)  # Force quit the program
-
-        schedule.every(1).minutes.do(scheduled_job)
+        if args.worker:
+            token = cluster_config_from_env()["token"]
+            worker, scheduler = start_worker(pool, CoordinatorClient(args.worker, worker_id, token))
+        else:
+            sinks_ready = startup.preload(SINK_MODULES)
+            if args.fast_start:
+                # Log in while the first sources are already being polled
+                threading.Thread(target=lambda: pool.release("lancers", pool.acquire("lancers")),
+                                 name="warm-lancers", daemon=True).start()
+            else:
+                # Open the first Lancers session up front so login problems surface immediately
+                pool.release("lancers", pool.acquire("lancers"))
+                startup.mark("first Chrome session")
+
+            seen = SeenStore()
+            startup.mark("seen store")
+            sinks_ready()  # e.g. a missing SLACK_WEBHOOK_URL stops the bot here
+            startup.mark("sinks ready")
+            # Detail pages load on their own sessions, the listing scrapers never wait for them
+            prefetcher = DetailPrefetcher(pool)
+            # Bids only with BID_SESSIONS_LANCERS > 0, on warm tabs logged in ahead of the first job
+            bidder = bidder_from_env(pool, prefetcher)
+            if bidder:
+                threading.Thread(target=bidder.warm, name="warm-bid-tabs", daemon=True).start()
+            pipeline = JobPipeline(seen, prefetcher=prefetcher, history=HistoryStore(), bidder=bidder)
+
+            if args.coordinator:
+                coordinator = Coordinator(seen, pipeline, all_sources())
+                coordinator.start_http_server()
+                # The coordinator scrapes too unless COORDINATOR_SCRAPE=0
+                if os.getenv("COORDINATOR_SCRAPE", "1") == "1":
+                    worker, scheduler = start_worker(pool, LocalClient(coordinator, "local"))
+                else:
+                    scheduler = None
+                schedule.every(5).minutes.do(lambda: logging.info(f"🧭 Assignments: {coordinator.assignments()}"))
+            else:
+                scheduler = make_scheduler(pool, seen, pipeline, all_sources())
+                threading.Thread(target=scheduler.run_forever, name="scheduler", daemon=True).start()
+
+        def report_status():
+            intervals = scheduler.intervals() if scheduler else {}
+            eventlog.event("poll_intervals", message="Poll intervals: " + ", ".join(
+                f"{dtype} {interval:.0f}s" for dtype, interval in intervals.items()), intervals=intervals)
+            print_skip_rates()
+            timeouts = TIMEOUTS.snapshot()
+            if timeouts:
+                eventlog.event("learned_timeouts", message="Learned timeouts: " + ", ".join(
+                    f"{key} {seconds:.0f}s" for key, seconds in sorted(timeouts.items())), timeouts=timeouts)
+
+        summary = eventlog.CycleSummary()
+        schedule.every(SUMMARY_INTERVAL).seconds.do(summary.log)
+        schedule.every(5).minutes.do(report_status)
+        schedule.every(2).minutes.do(pool.check_idle)
+        schedule.every(1).minutes.do(metrics.write_snapshot)
+        metrics.start_http_server()
 
         while True:
             try:
                 schedule.run_pending()
                 time.sleep(1)
             except Exception as e:
-                print(f"❌ Error in main loop: {e}")
-                logging.error(f"❌ Error in main loop: {e}")
-                driver.quit()
-                os._exit(1)  # Force quit the program
-                
+                # Keep the process (queues, caches, healthy sessions) alive
+                logging.exception(f"❌ Error in main loop: {e}")
+
     except Exception as e:
-        print(f"❌ Critical error in main: {e}")
         logging.error(f"❌ Critical error in main: {e}")
-        if 'driver' in locals():
-            driver.quit()
+        pool.quit_all()
+        eventlog.shutdown()  # os._exit skips atexit, write out the queued records first
         os._exit(1)  # Force quit the program
     finally:
-        if 'driver' in locals():
-            driver.quit()
+        if worker:
+            worker.stop()  # hand our sources to the other workers right away
+        pool.quit_all()
+        eventlog.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
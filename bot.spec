@@ -6,7 +6,8 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # Sinks are imported lazily / by name (startup.preload), make sure they are bundled
+    hiddenimports=['translate', 'notifySlack', 'update_sheet'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -26,7 +27,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX-compressed binaries have to be decompressed on every launch
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
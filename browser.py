@@ -7,9 +7,14 @@ import re
 from selenium.webdriver.chrome.options import Options
 import logging
 import json
-import time
+import html
+import requests
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from selenium.common.exceptions import TimeoutException
-from translate import translate_to_english, is_japanese_text
+from http_fetch import fetch_html
+import lean_mode
+import metrics
+from readiness import TIMEOUTS, load, wait_for
 
 def init_driver():
     options = Options()
@@ -25,10 +30,13 @@ def init_driver():
     # options.add_argument("--disable-web-security")
     # options.add_argument("--disable-extensions")
 
+    lean_mode.apply_options(options)
+
     driver = webdriver.Chrome(service=Service(), options=options)
+    lean_mode.enable(driver)
 
-    # Set page load timeout (max seconds to wait for driver.get())
-    driver.set_page_load_timeout(30000)  # e.g., 5 minutes :contentReference[oaicite:2]{index=2}
+    # Upper bound for driver.get(), each fetch then uses the timeout learned for its source
+    driver.set_page_load_timeout(TIMEOUTS.config["page_load_timeout"])
 
     # If you're using Selenium's internal HTTP calls:
     # try:
@@ -40,7 +48,6 @@ def init_driver():
 
 def login(driver, email, password):
     logging.info("Navigating to login page...")
-    print("Navigating to login page...")
     driver.get("https://www.lancers.jp/user/login?ref=header_menu")
 
     # Fill in email and password
@@ -57,120 +64,209 @@ def login(driver, email, password):
             lambda d: d.current_url.startswith("https://www.lancers.jp/mypage")
         )
         logging.info("✅ Login successful.")
-        print("✅ Login successful.")
     except:
         logging.error("❌ Login failed or took too long.")
-        print("❌ Login failed or took too long.")
         raise
 
 
-def get_lancers_jobs(driver, url, dtype):
-    print(f"Getting {dtype} jobs from Lancers...")
-    try:
-        driver.get(url)
-    except TimeoutException:
-        print("⚠️ Job list page load exceeded timeout, proceeding by stopping load.")
-        driver.execute_script("window.stop();")
-
-    # Wait for either job listings or no results message
-    try:
-        WebDriverWait(driver, 60).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, ".p-search-job-medias--lancer, .p-search-job-media"))
-        )
-    except TimeoutException:
-        print("No jobs found or page failed to load")
-        return []
+def page_url(url, page):
+    """
+    Returns the search URL for the given result page (page 1 is the URL itself).
+    """
+    if page <= 1:
+        return url
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "page"]
+    query.append(("page", str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
 
+def crawl_pages(fetch_page, url, dtype, known=None, max_pages=1, changed=None, throttle=None):
+    """
+    Walks newest-first result pages and stops as soon as a page contains a known job
+    (already seen or at/below the source watermark), a page comes back empty, or
+    max_pages is reached. Without a `known` check only the first page is read.
+    If `changed(jobs)` reports the first page identical to the previous cycle, nothing
+    is returned at all. Returns None if the first page could not be fetched.
+    `throttle()` is called before every page load (the host's request budget).
+    """
     jobs = []
-    for card in driver.find_elements(By.CSS_SELECTOR, ".p-search-job-media.c-media.c-media--item "):
-        onclick_str = card.get_attribute("onclick")
-        match = None  # Initialize match variable
-        if onclick_str:
-            match = re.search(r"goToLjpWorkDetail\((\d+)\)", onclick_str)            
-            
-        if not match:
-            continue
+    for page in range(1, (max_pages if known else 1) + 1):
+        if throttle:
+            throttle()
+        page_jobs = fetch_page(page_url(url, page), dtype)
+        if page_jobs is None:
+            return None if page == 1 else jobs
+        if page == 1 and changed and not changed(page_jobs):
+            logging.debug(f"💤 {dtype} listing unchanged, skipping.")
+            return []
+        jobs.extend(page_jobs)
+        if not known or not page_jobs or any(known(job["id"]) for job in page_jobs):
+            break
+        if page < max_pages:
+            logging.debug(f"↪️ No known {dtype} job on page {page}, reading page {page + 1}")
+    return jobs
+
+def get_lancers_jobs(driver, url, dtype, known=None, max_pages=1, changed=None, throttle=None):
+    return crawl_pages(lambda u, d: get_lancers_page(driver, u, d), url, dtype, known, max_pages, changed, throttle)
+
+def get_lancers_page(driver, url, dtype):
+    logging.debug(f"Getting {dtype} jobs from Lancers...")
+    load(driver, url, dtype)
+
+    # Returns as soon as either job listings or the (empty) result list exist
+    if not wait_for(driver, LANCERS_READY_JS, dtype, default=60):
+        # The result list exists even when there are no jobs, so this is a failed load
+        logging.warning(f"⚠️ {dtype} page failed to load")
+        return None
 
-        jid = match.group(1)
+    # Read every card in a single round trip to chromedriver
+    with metrics.timer("parse", dtype):
+        cards = driver.execute_script(LANCERS_CARDS_JS) or []
+        jobs = parse_lancers_cards(cards, dtype)
+    lean_mode.report(driver, dtype)
+    logging.debug(f"Found {len(jobs)} {dtype} jobs from Lancers.")
+    return jobs
+
+def parse_yen(text):
+    """
+    "10,000" -> 10000, or None if the text holds no number.
+    """
+    digits = re.sub(r"[^\d]", "", str(text or ""))
+    return int(digits) if digits else None
+
+def price_fields(price_min, price_max, kind):
+    """
+    Structured price of a job: yen amounts (None if unknown) and "fixed" or "hourly".
+    """
+    price_min = int(price_min) if price_min else None
+    price_max = int(price_max) if price_max else None
+    return {
+        "price_min": price_min,
+        "price_max": price_max,
+        "price_kind": kind if (price_min or price_max) else None,
+    }
+
+# Readiness conditions for readiness.wait_for, each returns null until the page is usable
+LANCERS_READY_JS = "return document.querySelector('.p-search-job-medias--lancer, .p-search-job-media') !== null;"
+CW_READY_JS = """
+var container = document.getElementById('vue-container');
+var data = container && container.getAttribute('data');
+return data && data.trim() ? data : null;
+"""
+DETAIL_READY_JS = """
+var description = document.querySelector('.p-work-detail-lancer__postscript-description');
+var apply = document.querySelector("a[href*='propose_start']");
+// Closed jobs have no apply link, give up on it once the page has fully loaded
+if (!description || (!apply && document.readyState !== 'complete')) return null;
+return {description: description.textContent, apply_url: apply ? apply.href : null};
+"""
+BID_FORM_READY_JS = "return document.querySelector(\"textarea[name='proposal']\") !== null;"
+# Fills in the proposal, SEND_BID_JS also presses send (one round trip for both)
+_FILL_BID = """
+var textarea = document.querySelector("textarea[name='proposal']");
+var button = document.querySelector('button.send-bid');
+if (!textarea || !button) return false;
+textarea.value = arguments[0];
+textarea.dispatchEvent(new Event('input', {bubbles: true}));
+textarea.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+FILL_BID_JS = _FILL_BID + "return true;\n"
+SEND_BID_JS = _FILL_BID + "button.click();\nreturn true;\n"
+
+# Collects id, title, badge and price numbers of every job card on a Lancers search page
+LANCERS_CARDS_JS = """
+return Array.from(document.querySelectorAll('.p-search-job-media.c-media.c-media--item')).map(function (card) {
+    var match = (card.getAttribute('onclick') || '').match(/goToLjpWorkDetail\\((\\d+)\\)/);
+    var title = card.querySelector('.p-search-job-media__title.c-media__title');
+    var badge = card.querySelector('.c-badge__text');
+    var price = card.querySelector('.p-search-job-media__price');
+    var numbers = price ? Array.from(price.querySelectorAll('.p-search-job-media__number')) : [];
+    return {
+        id: match ? match[1] : null,
+        title: title ? title.textContent : null,
+        badge: badge ? badge.innerText.trim() : '',
+        numbers: numbers.map(function (n) { return n.innerText.trim(); }),
+        priceText: price ? price.textContent : ''
+    };
+});
+"""
 
-        title_element = card.find_element(By.CSS_SELECTOR, ".p-search-job-media__title.c-media__title")
+def parse_lancers_cards(cards, dtype):
+    """
+    Converts the raw card dicts returned by LANCERS_CARDS_JS into job dicts,
+    dropping 求人 and コンペ jobs.
+    """
+    jobs = []
+    for card in cards:
+        jid = card.get("id")
+        if not jid or not card.get("title"):
+            continue
 
-        title_text = title_element.get_attribute("textContent").strip()
-        # Remove known tag texts if necessary (optional cleanup)
-        title_lines = [line.strip() for line in title_text.split('\n') if line.strip()]
-        title = title_lines[-1]  # Usually the actual title is last
+        # Remove known tag texts (the actual title is usually the last line)
+        title_lines = [line.strip() for line in card["title"].strip().split('\n') if line.strip()]
+        if not title_lines:
+            continue
+        title = title_lines[-1]
 
-        job_type = card.find_element(By.CSS_SELECTOR, ".c-badge__text").text.strip()
+        job_type = card.get("badge", "")
+        if job_type == "求人" or job_type == "コンペ":
+            continue
 
         # Get price range
-        price_element = card.find_element(By.CSS_SELECTOR, ".p-search-job-media__price")
-        price_numbers = price_element.find_elements(By.CSS_SELECTOR, ".p-search-job-media__number")
+        price_numbers = card.get("numbers") or []
         if len(price_numbers) == 2:
-            price_min = price_numbers[0].text.strip()
-            price_max = price_numbers[1].text.strip()
-            price_range = f"{price_min} ~ {price_max}"
+            price_range = f"{price_numbers[0]} ~ {price_numbers[1]}"
         else:
-            price_range = price_numbers[0].text.strip() if price_numbers else "N/A"
-        
+            price_range = price_numbers[0] if price_numbers else "N/A"
+        amounts = [parse_yen(n) for n in price_numbers]
+        kind = "hourly" if re.search("時給|時間", card.get("priceText") or "") else "fixed"
+
         link = f"https://www.lancers.jp/work/detail/{jid}"
-        # link = card.find_element(By.CSS_SELECTOR, "a").get_attribute("href")
-        if(job_type != "求人" and job_type != "コンペ"):
-            jobs.append({"dtype": dtype, "id": jid, "type": job_type, "title": title, "price": price_range, "url": link})
-        else:
-            continue
-    print(f"Found {len(jobs)} {dtype} jobs from Lancers.")
+        job = {"dtype": dtype, "id": jid, "type": job_type, "title": title, "price": price_range, "url": link}
+        jobs.append(dict(job, **price_fields(amounts[0] if len(amounts) == 2 else None,
+                                             amounts[-1] if amounts else None, kind)))
     return jobs
 
-def get_cw_jobs(driver, url, dtype):
-    print(f"Getting {dtype} jobs from Crowdworks...")
-    try:
-        driver.get(url)
-    except TimeoutException:
-        print("⚠️ Job list page load exceeded timeout, proceeding by stopping load.")
-        driver.execute_script("window.stop();")
+def get_cw_jobs(driver, url, dtype, known=None, max_pages=1, changed=None, throttle=None):
+    return crawl_pages(lambda u, d: get_cw_page(driver, u, d), url, dtype, known, max_pages, changed, throttle)
+
+def get_cw_page(driver, url, dtype):
+    logging.debug(f"Getting {dtype} jobs from Crowdworks...")
+    load(driver, url, dtype)
 
-    # Wait for the vue-container to be present with better error handling
+    # Returns the data attribute as soon as the Vue app has filled it in
     try:
-        # Wait for vue-container element to appear
-        container = WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.ID, "vue-container"))
-        )
-    except TimeoutException:
-        print(f"⚠️ Timeout waiting for Crowdworks page to load for {dtype}. Skipping this source.")
-        return []
+        data_json = wait_for(driver, CW_READY_JS, dtype, default=40)
     except Exception as e:
-        print(f"⚠️ Error waiting for Crowdworks page elements for {dtype}: {e}. Skipping this source.")
-        return []
+        logging.warning(f"⚠️ Error waiting for Crowdworks page elements for {dtype}: {e}. Skipping this source.")
+        return None
+    finally:
+        lean_mode.report(driver, dtype)
 
-    # Try to find the vue-container element and wait for data attribute
+    if not data_json:
+        logging.warning(f"⚠️ No data attribute found in vue-container for {dtype} after waiting. Skipping this source.")
+        return None
     try:
-        
-        # Wait for data attribute to be populated (JavaScript may need time to set it)
-        data_json = None
-        for attempt in range(5):  # Try up to 5 times with 2 second delays
-            data_json = container.get_attribute("data")
-            if data_json and data_json.strip():
-                break
-            time.sleep(2)  # Wait 2 seconds before retrying
-            container = driver.find_element(By.ID, "vue-container")  # Refresh element reference
-        
-        if not data_json or not data_json.strip():
-            print(f"⚠️ No data attribute found in vue-container for {dtype} after waiting. Skipping this source.")
-            return []
-        
         data = json.loads(data_json)
-    except Exception as e:
-        print(f"⚠️ Error parsing Crowdworks data for {dtype}: {e}. Skipping this source.")
-        return []
+    except ValueError as e:
+        logging.warning(f"⚠️ Error parsing Crowdworks data for {dtype}: {e}. Skipping this source.")
+        return None
 
+    with metrics.timer("parse", dtype):
+        return parse_cw_data(data, dtype)
+
+def parse_cw_data(data, dtype):
+    """
+    Converts the decoded vue-container JSON of a Crowdworks search page into job dicts.
+    """
     # Safely extract job offers
     try:
         if "searchResult" not in data or "job_offers" not in data["searchResult"]:
-            print(f"⚠️ No job_offers found in Crowdworks data for {dtype}. Skipping this source.")
+            logging.warning(f"⚠️ No job_offers found in Crowdworks data for {dtype}. Skipping this source.")
             return []
         job_offers = data["searchResult"]["job_offers"]
     except Exception as e:
-        print(f"⚠️ Error extracting job offers for {dtype}: {e}. Skipping this source.")
+        logging.warning(f"⚠️ Error extracting job offers for {dtype}: {e}. Skipping this source.")
         return []
 
     jobs = []
@@ -182,6 +278,7 @@ def get_cw_jobs(driver, url, dtype):
             # Payment info
             payment = offer.get("payment", {})
             price_range = "discuss"
+            prices = price_fields(None, None, None)
             if "fixed_price_payment" in payment:
                 min_budget = payment["fixed_price_payment"].get("min_budget")
                 max_budget = payment["fixed_price_payment"].get("max_budget")
@@ -189,6 +286,7 @@ def get_cw_jobs(driver, url, dtype):
                     price_range = f"{int(min_budget)} ~ {int(max_budget)}"
                 elif max_budget:
                     price_range = f"{int(max_budget)}"
+                prices = price_fields(min_budget, max_budget, "fixed")
             elif "hourly_payment" in payment:
                 min_wage = payment["hourly_payment"].get("min_hourly_wage")
                 max_wage = payment["hourly_payment"].get("max_hourly_wage")
@@ -196,6 +294,7 @@ def get_cw_jobs(driver, url, dtype):
                     price_range = f"{int(min_wage)} ~ {int(max_wage)} (hourly)"
                 elif max_wage:
                     price_range = f"{int(max_wage)} (hourly)"
+                prices = price_fields(min_wage, max_wage, "hourly")
             link = f"https://crowdworks.jp/public/jobs/{job_id}"
             jobs.append({
                 "dtype": dtype,
@@ -203,39 +302,80 @@ def get_cw_jobs(driver, url, dtype):
                 "type": "not_specified",
                 "title": title,
                 "price": price_range,
-                "url": link
+                "url": link,
+                # Publication time when the listing exposes it, used for posted-to-notified latency
+                "posted_at": job.get("last_released_at") or job.get("created_at"),
+                **prices,
             })
         except Exception as e:
-            print(f"⚠️ Error processing individual job offer for {dtype}: {e}. Skipping this job.")
+            logging.warning(f"⚠️ Error processing individual job offer for {dtype}: {e}. Skipping this job.")
             continue
     
-    print(f"Found {len(jobs)} {dtype} jobs from Crowdworks.")
+    logging.debug(f"Found {len(jobs)} {dtype} jobs from Crowdworks.")
     return jobs
 
-def get_description(driver, url):
+def get_cw_jobs_http(url, dtype, known=None, max_pages=1, changed=None, throttle=None):
+    """
+    Browserless variant of get_cw_jobs: fetches the search pages over the pooled HTTP
+    session and reads the vue-container JSON straight from the HTML.
+    Returns None if the first page could not be fetched or parsed, so the caller can fall back to Chrome.
+    """
+    return crawl_pages(get_cw_page_http, url, dtype, known, max_pages, changed, throttle)
+
+def get_cw_page_http(url, dtype):
+    logging.debug(f"Getting {dtype} jobs from Crowdworks (http)...")
     try:
-        driver.get(url)
-    except TimeoutException:
-        print("⚠️ Job description page load exceeded timeout, proceeding by stopping load.")
-        driver.execute_script("window.stop();")
-
-    # Get job description text
-    description_element = WebDriverWait(driver, 60).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, ".p-work-detail-lancer__postscript-description"))
-    )
-    description_text = description_element.get_attribute("textContent").strip()
-
-    # Get apply URL
-    apply_element = WebDriverWait(driver, 60).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='propose_start']"))
-    )
-    apply_url = apply_element.get_attribute("href")
-    
-    # Generate proposal using the job info and description
-    job_info = { 
-        "description": description_text,
-        "apply_url": apply_url
-    }
+        with metrics.timer("http_fetch", dtype):
+            page = fetch_html(url, source=dtype)
+    except requests.RequestException as e:
+        logging.warning(f"⚠️ HTTP fetch failed for {dtype}: {e}")
+        return None
+
+    with metrics.timer("parse", dtype):
+        data_json = extract_cw_data_attribute(page)
+        if not data_json:
+            logging.warning(f"⚠️ No vue-container data in HTTP response for {dtype}.")
+            return None
+
+        try:
+            data = json.loads(data_json)
+        except json.JSONDecodeError as e:
+            logging.warning(f"⚠️ Error parsing Crowdworks data for {dtype}: {e}")
+            return None
+
+        return parse_cw_data(data, dtype)
+
+_TAG_RE = re.compile(r'<[a-zA-Z]+(?:[^>"\']|"[^"]*"|\'[^\']*\')*>', re.S)
+_VUE_CONTAINER_ID_RE = re.compile(r'\sid=["\']vue-container["\']')
+_DATA_ATTR_RE = re.compile(r'\sdata=(?:"([^"]*)"|\'([^\']*)\')', re.S)
+
+def extract_cw_data_attribute(page):
+    """
+    Returns the unescaped data attribute of #vue-container, or None.
+    """
+    pos = page.find("vue-container")
+    while pos != -1:
+        tag = _TAG_RE.match(page, page.rfind("<", 0, pos))
+        if tag and _VUE_CONTAINER_ID_RE.search(tag.group(0)):
+            break
+        pos = page.find("vue-container", pos + 1)
+    else:
+        return None
+    attr = _DATA_ATTR_RE.search(tag.group(0))
+    if not attr:
+        return None
+    value = html.unescape(attr.group(1) if attr.group(1) is not None else attr.group(2))
+    return value if value.strip() else None
+
+def get_description(driver, url, timeout=60):
+    load(driver, url, "detail")
+
+    # Description and apply URL in one round trip, as soon as both are on the page
+    job_info = wait_for(driver, DETAIL_READY_JS, "detail", default=timeout, limit=timeout)
+    if not job_info:
+        raise TimeoutException(f"Job description did not load within {timeout}s: {url}")
+    lean_mode.report(driver, "detail")
+    job_info["description"] = job_info["description"].strip()
 
     return job_info
     # proposal_text = generate_proposal(job_info)
@@ -245,10 +385,25 @@ def get_description(driver, url):
     # driver.find_element(By.NAME, "deadline").send_keys(deadline)
     # driver.find_element(By.CSS_SELECTOR, "button.send-bid").click()
 
+def open_bid_form(driver, url, timeout=10):
+    """
+    Loads a proposal form and returns as soon as its text area exists.
+    """
+    load(driver, url, "bid_form")
+    if not wait_for(driver, BID_FORM_READY_JS, "bid_form", default=timeout, limit=timeout):
+        raise TimeoutException(f"Proposal form did not load within {timeout}s: {url}")
+
+def send_bid(driver, proposal, submit=True):
+    """
+    Fills in the proposal opened by open_bid_form and submits it in one round trip
+    (send_keys types character by character and cannot type emoji). With submit=False
+    the form is only filled in.
+    """
+    if not driver.execute_script(SEND_BID_JS if submit else FILL_BID_JS, proposal):
+        raise RuntimeError("Proposal form has no text area or send button")
+
 def submit_bid(driver, url, proposal):
-    driver.get(url)
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "textarea[name='proposal']")))
-    driver.find_element(By.CSS_SELECTOR, "textarea[name='proposal']").send_keys(proposal)
-    driver.find_element(By.CSS_SELECTOR, "button.send-bid").click()
+    open_bid_form(driver, url)
+    send_bid(driver, proposal)
 
 
@@ -0,0 +1,42 @@
+# change_detect.py
+import hashlib
+import threading
+import metrics
+
+
+def listing_fingerprint(jobs) -> str:
+    """
+    Cheap fingerprint of a listing page: a hash of its ordered job ids.
+    """
+    return hashlib.sha1("\n".join(str(job["id"]) for job in jobs).encode("utf-8")).hexdigest()
+
+
+class ListingFingerprints:
+    """
+    Remembers the first-page fingerprint of every source between cycles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}
+
+    def changed(self, dtype, jobs) -> bool:
+        """
+        Returns False (and counts a skip) if the listing is identical to the previous cycle.
+        """
+        fingerprint = listing_fingerprint(jobs)
+        with self._lock:
+            previous = self._last.get(dtype)
+            self._last[dtype] = fingerprint
+        metrics.incr("listings_checked", dtype)
+        if previous == fingerprint:
+            metrics.incr("listings_unchanged", dtype)
+            return False
+        return True
+
+    def forget(self, dtype):
+        """
+        Drops the stored fingerprint so the next cycle processes the source fully.
+        """
+        with self._lock:
+            self._last.pop(dtype, None)
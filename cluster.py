@@ -0,0 +1,356 @@
+# cluster.py
+import os
+import json
+import math
+import time
+import hashlib
+import hmac
+import ipaddress
+import logging
+import threading
+import requests
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import metrics
+
+# Reported ids a worker remembers on top of its watermarks
+REPORTED_HISTORY = int(os.getenv("REPORTED_HISTORY", "50000"))
+
+
+def cluster_config_from_env():
+    return {
+        "host": os.getenv("COORDINATOR_HOST", "127.0.0.1"),
+        "port": int(os.getenv("COORDINATOR_PORT", "8765")),
+        # Shared secret sent by workers in the X-Jobbot-Token header (empty: no check,
+        # only allowed when the coordinator listens on a loopback address)
+        "token": os.getenv("COORDINATOR_TOKEN", ""),
+        "heartbeat": float(os.getenv("WORKER_HEARTBEAT", "10")),
+        # A worker that has not sent a heartbeat for this long is considered gone
+        "lease": float(os.getenv("WORKER_LEASE", "30")),
+    }
+
+
+def is_loopback(host) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def rendezvous_scores(dtype, workers):
+    """
+    Ranks workers for a source with weighted rendezvous hashing: every (source, worker)
+    pair gets a pseudo-random score scaled by the worker's capacity, highest first.
+    `workers` maps worker id -> capacity (weight).
+    """
+    scores = []
+    for worker_id, capacity in workers.items():
+        digest = hashlib.sha1(f"{dtype}|{worker_id}".encode("utf-8")).digest()
+        uniform = (int.from_bytes(digest[:8], "big") + 1) / (2 ** 64 + 1)
+        scores.append((-max(1, capacity) / math.log(uniform), worker_id))
+    return [worker_id for _, worker_id in sorted(scores, reverse=True)]
+
+
+def assign_sources(sources, workers):
+    """
+    Spreads sources over workers in proportion to their capacity. Each source goes to
+    its highest-ranked worker that still has room, so when a worker joins or leaves
+    only a few sources move and the rest keep their worker (and its warm sessions).
+    """
+    result = {worker_id: [] for worker_id in workers}
+    if not workers:
+        return result
+    total = sum(max(1, capacity) for capacity in workers.values())
+    room = {worker_id: math.ceil(len(sources) * max(1, capacity) / total) for worker_id, capacity in workers.items()}
+    for dtype in sorted(sources):
+        for worker_id in rendezvous_scores(dtype, workers):
+            if len(result[worker_id]) < room[worker_id]:
+                result[worker_id].append(dtype)
+                break
+    return result
+
+
+class Coordinator:
+    """
+    Owns the shared state of a cluster: the seen store, watermarks and the publish
+    pipeline (translation, Slack, Sheets). Workers only scrape.
+
+    Sources are spread over the live workers by capacity-bounded rendezvous hashing,
+    recomputed on every heartbeat, so a worker that joins takes over a share of the sources and the sources of
+    a worker that leaves (or whose lease runs out) move to the remaining ones. Reported
+    jobs go through the same pipeline as in single-process mode, whose atomic claims make
+    sure a job is notified once even if two workers briefly poll the same source.
+    """
+
+    def __init__(self, seen, pipeline, sources, config=None):
+        self.seen = seen
+        self.pipeline = pipeline
+        self.sources = list(sources)
+        self.config = dict(config or cluster_config_from_env())
+        self._workers = {}  # worker id -> {"capacity", "last_seen", "info"}
+        self._lock = threading.Lock()
+
+    def _live_workers(self):
+        now = time.time()
+        with self._lock:
+            for worker_id in [w for w, state in self._workers.items() if now - state["last_seen"] > self.config["lease"]]:
+                del self._workers[worker_id]
+                logging.warning(f"🔌 Worker {worker_id} missed its heartbeats, reassigning its sources")
+            return {worker_id: state["capacity"] for worker_id, state in self._workers.items()}
+
+    def assignments(self):
+        """
+        Returns {worker id: [dtype, ...]} for the current set of live workers.
+        """
+        return assign_sources(self.sources, self._live_workers())
+
+    def heartbeat(self, worker_id, capacity=1, info=None):
+        """
+        Registers or refreshes a worker and returns its sources and their watermarks.
+        """
+        with self._lock:
+            if worker_id not in self._workers:
+                logging.info(f"🔌 Worker {worker_id} joined (capacity {capacity})")
+            self._workers[worker_id] = {"capacity": capacity, "last_seen": time.time(), "info": info or {}}
+        sources = self.assignments().get(worker_id, [])
+        metrics.incr("worker_heartbeats", worker_id)
+        return {
+            "sources": sources,
+            "watermarks": {dtype: self.seen.get_watermark(dtype) for dtype in sources},
+            "heartbeat": self.config["heartbeat"],
+        }
+
+    def leave(self, worker_id):
+        with self._lock:
+            if self._workers.pop(worker_id, None) is not None:
+                logging.info(f"🔌 Worker {worker_id} left")
+        return {"ok": True}
+
+    def report(self, worker_id, dtype, jobs):
+        """
+        Takes the jobs a worker scraped from one source. Returns how many were new.
+        Blocks while the pipeline is full, which slows the reporting worker down.
+        """
+        metrics.incr("worker_reports", worker_id)
+        new_jobs = self.pipeline.submit(jobs)
+        self.seen.update_watermark(dtype, jobs)
+        return {"new": new_jobs}
+
+    def status(self):
+        with self._lock:
+            workers = {w: {"capacity": s["capacity"], "age": round(time.time() - s["last_seen"], 1), **s["info"]}
+                       for w, s in self._workers.items()}
+        return {"workers": workers, "assignments": self.assignments()}
+
+    def start_http_server(self):
+        """
+        Serves the worker API: POST /heartbeat, /report and /leave, GET /status.
+        Refuses to listen beyond loopback without a COORDINATOR_TOKEN.
+        """
+        coordinator = self
+        token = self.config["token"]
+        if not token and not is_loopback(self.config["host"]):
+            raise ValueError(f"COORDINATOR_TOKEN must be set to listen on {self.config['host']}, "
+                             f"anyone reaching that address could report jobs and read the status")
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _authorized(self):
+                if token and not hmac.compare_digest(self.headers.get("X-Jobbot-Token", ""), token):
+                    self._reply(403, {"error": "bad token"})
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                if self.path.startswith("/status"):
+                    self._reply(200, coordinator.status())
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    worker_id = body["worker_id"]
+                    if self.path.startswith("/heartbeat"):
+                        result = coordinator.heartbeat(worker_id, body.get("capacity", 1), body.get("info"))
+                    elif self.path.startswith("/report"):
+                        result = coordinator.report(worker_id, body["dtype"], body.get("jobs") or [])
+                    elif self.path.startswith("/leave"):
+                        result = coordinator.leave(worker_id)
+                    else:
+                        self._reply(404, {"error": "not found"})
+                        return
+                except (KeyError, ValueError) as e:
+                    self._reply(400, {"error": str(e)})
+                    return
+                self._reply(200, result)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((self.config["host"], self.config["port"]), Handler)
+        threading.Thread(target=server.serve_forever, name="coordinator-http", daemon=True).start()
+        logging.info(f"🧭 Coordinator listening on http://{self.config['host']}:{server.server_port}")
+        return server
+
+
+class LocalClient:
+    """
+    Talks to a Coordinator in the same process (the coordinator's own scraping worker).
+    """
+
+    def __init__(self, coordinator, worker_id):
+        self.coordinator = coordinator
+        self.worker_id = worker_id
+
+    def heartbeat(self, capacity, info=None):
+        return self.coordinator.heartbeat(self.worker_id, capacity, info)
+
+    def report(self, dtype, jobs):
+        return self.coordinator.report(self.worker_id, dtype, jobs)
+
+    def leave(self):
+        return self.coordinator.leave(self.worker_id)
+
+
+class CoordinatorClient:
+    """
+    Talks to a remote Coordinator over HTTP.
+    """
+
+    def __init__(self, base_url, worker_id, token="", timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.worker_id = worker_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers["X-Jobbot-Token"] = token
+
+    def _post(self, path, **body):
+        resp = self.session.post(f"{self.base_url}{path}", json=dict(body, worker_id=self.worker_id), timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def heartbeat(self, capacity, info=None):
+        return self._post("/heartbeat", capacity=capacity, info=info or {})
+
+    def report(self, dtype, jobs):
+        return self._post("/report", dtype=dtype, jobs=jobs)
+
+    def leave(self):
+        return self._post("/leave")
+
+
+class RemoteSeen:
+    """
+    The part of the seen store a worker needs for paging: watermarks handed out by the
+    coordinator plus the `history` most recent ids this worker already reported. Dedup
+    itself happens on the coordinator.
+    """
+
+    def __init__(self, history=REPORTED_HISTORY):
+        self.history = max(1, history)
+        self._watermarks = {}
+        self._reported = OrderedDict()  # (dtype, id) -> None, oldest first
+        self._lock = threading.Lock()
+
+    def set_watermarks(self, watermarks):
+        with self._lock:
+            for dtype, jid in watermarks.items():
+                current = self._watermarks.get(dtype)
+                if jid and (current is None or int(jid) > int(current)):
+                    self._watermarks[dtype] = jid
+
+    def get_watermark(self, dtype):
+        return self._watermarks.get(dtype)
+
+    def update_watermark(self, dtype, jobs):
+        ids = [str(job["id"]) for job in jobs if str(job["id"]).isdigit()]
+        if ids:
+            self.set_watermarks({dtype: max(ids, key=int)})
+
+    def is_known(self, dtype, jid) -> bool:
+        if (dtype, str(jid)) in self._reported:
+            return True
+        watermark = self._watermarks.get(dtype)
+        return bool(watermark) and str(jid).isdigit() and int(jid) <= int(watermark)
+
+    def mark_reported(self, dtype, jobs):
+        with self._lock:
+            for job in jobs:
+                key = (dtype, str(job["id"]))
+                self._reported[key] = None
+                self._reported.move_to_end(key)
+            while len(self._reported) > self.history:
+                self._reported.popitem(last=False)
+
+
+class ReportingPipeline:
+    """
+    Stands in for JobPipeline on a worker: submit() hands the jobs to the coordinator.
+    """
+
+    def __init__(self, client, seen):
+        self.client = client
+        self.seen = seen
+
+    def submit(self, jobs) -> int:
+        if not jobs:
+            return 0
+        dtype = jobs[0]["dtype"]
+        new_jobs = self.client.report(dtype, jobs)["new"]
+        self.seen.mark_reported(dtype, jobs)
+        return new_jobs
+
+
+class Worker:
+    """
+    Polls the sources the coordinator assigns to it with its own browser sessions and
+    proxy, and keeps its assignment fresh through periodic heartbeats.
+    """
+
+    def __init__(self, client, scheduler, seen, capacity, info=None):
+        self.client = client
+        self.scheduler = scheduler
+        self.seen = seen
+        self.capacity = capacity
+        self.info = info or {}
+        self.interval = cluster_config_from_env()["heartbeat"]
+        self._stopping = threading.Event()
+
+    def heartbeat(self):
+        assignment = self.client.heartbeat(self.capacity, self.info)
+        self.seen.set_watermarks(assignment.get("watermarks") or {})
+        added, removed = self.scheduler.set_sources(assignment.get("sources") or [])
+        if added or removed:
+            logging.info(f"🧭 {self.client.worker_id} now polls {', '.join(sorted(self.scheduler.sources)) or 'nothing'}")
+        self.interval = assignment.get("heartbeat", self.interval)
+
+    def run_heartbeats(self):
+        while not self._stopping.is_set():
+            try:
+                self.heartbeat()
+            except Exception as e:
+                # Keep polling the last assignment, the coordinator reassigns it if we stay away
+                logging.error(f"⚠️ Heartbeat to coordinator failed: {e}")
+            self._stopping.wait(self.interval)
+
+    def stop(self):
+        self._stopping.set()
+        try:
+            self.client.leave()
+        except Exception as e:
+            logging.error(f"⚠️ Could not sign off from coordinator: {e}")
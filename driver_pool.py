@@ -0,0 +1,145 @@
+# driver_pool.py
+import os
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+def session_limits_from_env():
+    """
+    Max number of concurrent browser sessions per site, configurable from .env
+    """
+    return {
+        "lancers": max(1, int(os.getenv("SCRAPE_SESSIONS_LANCERS", "2"))),
+        "cw": max(1, int(os.getenv("SCRAPE_SESSIONS_CW", "2"))),
+    }
+
+
+class DriverPool:
+    """
+    Pool of browser sessions grouped by site.
+
+    Sessions are created lazily through ``factory(site, slot)`` up to the per-site limit and
+    are handed out one caller at a time, so a WebDriver is never shared between threads.
+    ``slot`` is a stable index per site (e.g. for a persistent profile directory).
+
+    If a caller fails while holding a session and ``health_check(driver)`` says the
+    browser is dead or hung, that session is thrown away and a fresh browser is started
+    on the next acquire, without touching the rest of the process.
+    """
+
+    def __init__(self, factory, limits=None, health_check=None, discard=None):
+        self.factory = factory
+        self.health_check = health_check
+        self.discard_driver = discard or (lambda driver: driver.quit())
+        self.limits = dict(limits or session_limits_from_env())
+        self._idle = {site: queue.Queue() for site in self.limits}
+        self._created = {site: 0 for site in self.limits}
+        self._slots = {}  # id(driver) -> slot
+        self._all = []
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()  # proxy extension + login are not thread safe
+
+    def total_limit(self) -> int:
+        return sum(self.limits.values())
+
+    def _free_slot(self, site):
+        used = {slot for (s, slot) in self._slots.values() if s == site}
+        return next(slot for slot in range(self.limits[site] + 1) if slot not in used)
+
+    def acquire(self, site):
+        idle = self._idle[site]
+        while True:
+            try:
+                return idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_create = self._created[site] < self.limits[site]
+                if can_create:
+                    self._created[site] += 1
+                    slot = self._free_slot(site)
+                    self._slots[("pending", site, slot)] = (site, slot)
+            if can_create:
+                break
+
+            # Wait for a session of this site to be released (or discarded, freeing a slot)
+            try:
+                return idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+        try:
+            with self._create_lock:
+                logging.info(f"Starting new {site} browser session (slot {slot})...")
+                driver = self.factory(site, slot)
+        except Exception:
+            with self._lock:
+                self._created[site] -= 1
+                self._slots.pop(("pending", site, slot), None)
+            raise
+        with self._lock:
+            self._slots.pop(("pending", site, slot), None)
+            self._slots[id(driver)] = (site, slot)
+            self._all.append(driver)
+        return driver
+
+    def release(self, site, driver):
+        self._idle[site].put(driver)
+
+    def discard(self, site, driver):
+        """
+        Drops a broken session; the next acquire starts a fresh browser in its slot.
+        """
+        with self._lock:
+            self._created[site] -= 1
+            self._slots.pop(id(driver), None)
+            if driver in self._all:
+                self._all.remove(driver)
+        logging.warning(f"♻️ Discarding dead {site} browser session, it will be restarted on demand")
+        try:
+            self.discard_driver(driver)
+        except Exception as e:
+            logging.error(f"⚠️ Error closing browser session: {e}")
+
+    @contextmanager
+    def session(self, site):
+        driver = self.acquire(site)
+        try:
+            yield driver
+        except Exception:
+            if self.health_check and not self.health_check(driver):
+                self.discard(site, driver)
+                driver = None
+            raise
+        finally:
+            if driver is not None:
+                self.release(site, driver)
+
+    def check_idle(self):
+        """
+        Health-checks every idle session and discards the dead ones.
+        """
+        if not self.health_check:
+            return
+        for site, idle in self._idle.items():
+            for _ in range(idle.qsize()):
+                try:
+                    driver = idle.get_nowait()
+                except queue.Empty:
+                    break
+                if self.health_check(driver):
+                    idle.put(driver)
+                else:
+                    self.discard(site, driver)
+
+    def quit_all(self):
+        with self._lock:
+            drivers, self._all = self._all, []
+            self._slots.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.error(f"⚠️ Error closing browser session: {e}")
@@ -0,0 +1,145 @@
+# eventlog.py
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+import metrics
+
+EVENTS = logging.getLogger("jobbot.events")
+
+_listener = None
+
+
+def logging_config_from_env():
+    return {
+        "file": os.getenv("LOG_FILE", os.path.join("logs", "jobbot.jsonl")),
+        "level": os.getenv("LOG_LEVEL", "INFO").upper(),
+        "console_level": os.getenv("CONSOLE_LOG_LEVEL", "INFO").upper(),
+        "max_bytes": int(os.getenv("LOG_MAX_BYTES", str(5 * 2**20))),
+        "backups": int(os.getenv("LOG_BACKUPS", "5")),
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, thread, message and any event fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created)),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+            entry.update(getattr(record, "fields", {}))
+        entry["msg"] = record.getMessage()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ConsoleFilter(logging.Filter):
+    # Per-job events are summarised per cycle on the console, they only go to the file
+    def filter(self, record):
+        return not getattr(record, "event", None) or record.levelno >= logging.WARNING
+
+
+def setup_logging(config=None):
+    """
+    Routes all logging through a queue: callers only enqueue a record, a background
+    listener thread formats and writes it to the rotated JSONL file and the console.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    config = dict(config or logging_config_from_env())
+
+    handlers = []
+    if config["file"]:
+        directory = os.path.dirname(config["file"])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            config["file"], maxBytes=config["max_bytes"], backupCount=config["backups"], encoding="utf-8"
+        )
+        file_handler.setLevel(config["level"])
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(config["console_level"])
+    console.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%H:%M:%S"))
+    console.addFilter(_ConsoleFilter())
+    handlers.append(console)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(min(logging.getLevelName(config["level"]), logging.getLevelName(config["console_level"])))
+    # Chatty libraries stay at WARNING unless asked for
+    for name in ("urllib3", "selenium", "gspread", "google"):
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """
+    Writes out whatever is still queued.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def event(name, level=logging.INFO, message=None, **fields):
+    """
+    Logs a structured event, e.g. event("job_published", dtype="CW_web", id="123").
+    """
+    if EVENTS.isEnabledFor(level):
+        EVENTS.log(level, message or name, extra={"event": name, "fields": fields})
+
+
+class CycleSummary:
+    """
+    Compact console line per cycle, built from the metric counters since the last one.
+    """
+
+    COUNTERS = (
+        ("jobs_found", "found"), ("jobs_new", "new"), ("jobs_filtered", "filtered"),
+        ("jobs_near_duplicate", "dups"), ("jobs_notified", "notified"), ("scrape_errors", "errors"),
+    )
+
+    def __init__(self):
+        self._last = self._totals()
+        self._since = time.time()
+
+    @staticmethod
+    def _totals():
+        counters = metrics.counters()
+        return {name: sum(counters.get(name, {}).values()) for name, _ in CycleSummary.COUNTERS}
+
+    def line(self, label=None):
+        totals = self._totals()
+        parts = [f"{totals[name] - self._last[name]} {short}" for name, short in self.COUNTERS]
+        elapsed = time.time() - self._since
+        self._last, self._since = totals, time.time()
+        return f"📊 {label or f'last {elapsed:.0f}s'}: " + ", ".join(parts)
+
+    def log(self, label=None):
+        logging.getLogger("jobbot").info(self.line(label))
@@ -0,0 +1,288 @@
+# history.py
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from seen_store import site_of
+
+HISTORY_DB_FILE = os.getenv("HISTORY_DB_FILE", "history.db")
+
+# What finally happened to a job, each has a counter column in the hourly rollup
+STATUSES = ("published", "filtered", "duplicate")
+
+
+def category_of(dtype: str) -> str:
+    """
+    "Lancers_AI" -> "AI", "CW_web" -> "web".
+    """
+    return dtype.split("_", 1)[1] if "_" in dtype else ""
+
+
+class HistoryStore:
+    """
+    Every scraped job, kept in SQLite for later analysis.
+
+    A job is inserted the first time any source reports it and only its last_seen time
+    (and later its status) changes afterwards. Each new job also bumps a per-source,
+    per-hour rollup row, and jobs with a budget bump a per-day count of that budget, so
+    counts and budget statistics (including exact medians) over days or weeks read a few
+    thousand rollup rows instead of millions of jobs.
+    """
+
+    def __init__(self, path=HISTORY_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                site       TEXT NOT NULL,
+                id         TEXT NOT NULL,
+                dtype      TEXT NOT NULL,
+                category   TEXT,
+                first_seen REAL NOT NULL,
+                last_seen  REAL NOT NULL,
+                posted_at  TEXT,
+                type       TEXT,
+                title      TEXT,
+                url        TEXT,
+                price      TEXT,
+                price_min  INTEGER,
+                price_max  INTEGER,
+                price_kind TEXT,
+                budget     INTEGER,
+                status     TEXT,
+                score      REAL,
+                PRIMARY KEY (site, id)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_dtype_time ON jobs (dtype, first_seen);
+            CREATE INDEX IF NOT EXISTS jobs_time ON jobs (first_seen);
+            CREATE TABLE IF NOT EXISTS hourly (
+                dtype     TEXT NOT NULL,
+                hour      INTEGER NOT NULL,
+                jobs      INTEGER NOT NULL DEFAULT 0,
+                published INTEGER NOT NULL DEFAULT 0,
+                filtered  INTEGER NOT NULL DEFAULT 0,
+                duplicate INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dtype, hour)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS daily_budgets (
+                dtype      TEXT NOT NULL,
+                price_kind TEXT NOT NULL,
+                day        INTEGER NOT NULL,
+                budget     INTEGER NOT NULL,
+                jobs       INTEGER NOT NULL,
+                PRIMARY KEY (price_kind, dtype, budget, day)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def record(self, jobs, now=None) -> int:
+        """
+        Stores a source's scraped jobs in one transaction. Returns how many were new.
+        """
+        now = time.time() if now is None else now
+        new_jobs = {}  # (dtype, hour) -> count
+        new_budgets = {}  # (dtype, kind, day, budget) -> count
+        with self._lock:
+            for job in jobs:
+                dtype = job["dtype"]
+                first_seen = job.get("found_ts") or now
+                price_min, price_max = job.get("price_min"), job.get("price_max")
+                budget = price_max if price_max is not None else price_min
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO jobs (site, id, dtype, category, first_seen, last_seen, posted_at, type, "
+                    "title, url, price, price_min, price_max, price_kind, budget) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        site_of(dtype), str(job["id"]), dtype, category_of(dtype),
+                        first_seen, now, job.get("posted_at"), job.get("type"),
+                        job.get("title"), job.get("url"), job.get("price"),
+                        price_min, price_max, job.get("price_kind"),
+                        budget,
+                    ),
+                )
+                if cursor.rowcount:
+                    hour = (dtype, int(first_seen // 3600))
+                    new_jobs[hour] = new_jobs.get(hour, 0) + 1
+                    if budget is not None and job.get("price_kind"):
+                        day = (dtype, job["price_kind"], int(first_seen // 86400), budget)
+                        new_budgets[day] = new_budgets.get(day, 0) + 1
+                else:
+                    self._conn.execute(
+                        "UPDATE jobs SET last_seen = ? WHERE site = ? AND id = ?",
+                        (now, site_of(dtype), str(job["id"])),
+                    )
+            self._conn.executemany(
+                "INSERT INTO hourly (dtype, hour, jobs) VALUES (?, ?, ?) "
+                "ON CONFLICT (dtype, hour) DO UPDATE SET jobs = jobs + excluded.jobs",
+                [(dtype, hour, count) for (dtype, hour), count in new_jobs.items()],
+            )
+            self._conn.executemany(
+                "INSERT INTO daily_budgets (dtype, price_kind, day, budget, jobs) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (price_kind, dtype, budget, day) DO UPDATE SET jobs = jobs + excluded.jobs",
+                [(*key, count) for key, count in new_budgets.items()],
+            )
+            self._conn.commit()
+        return sum(new_jobs.values())
+
+    def set_status(self, job, status, score=None):
+        """
+        Records what happened to a job ("published", "filtered" or "duplicate").
+        """
+        if status not in STATUSES:
+            raise ValueError(f"unknown status {status!r}")
+        key = (site_of(job["dtype"]), str(job["id"]))
+        with self._lock:
+            row = self._conn.execute("SELECT dtype, first_seen, status FROM jobs WHERE site = ? AND id = ?", key).fetchone()
+            if row is None or row[2] == status:
+                return
+            dtype, first_seen, previous = row
+            self._conn.execute("UPDATE jobs SET status = ?, score = ? WHERE site = ? AND id = ?", (status, score, *key))
+            # status is one of STATUSES, safe to use as a column name
+            updates = [(f"{status} = {status} + 1", dtype, int(first_seen // 3600))]
+            if previous in STATUSES:
+                updates.append((f"{previous} = {previous} - 1", dtype, int(first_seen // 3600)))
+            for assignment, dtype, hour in updates:
+                self._conn.execute(f"UPDATE hourly SET {assignment} WHERE dtype = ? AND hour = ?", (dtype, hour))
+            self._conn.commit()
+
+    def counts(self, since, until=None, dtype=None, bucket=3600):
+        """
+        Returns [(bucket start, dtype, jobs, published, filtered, duplicate)] from the
+        hourly rollup. `bucket` is a multiple of an hour, e.g. 86400 for days, or None
+        for one total per source.
+        """
+        hours = max(1, int(bucket // 3600)) if bucket else 1 << 40
+        sql = (
+            "SELECT (hour / ?) * ? * 3600, dtype, SUM(jobs), SUM(published), SUM(filtered), SUM(duplicate) "
+            "FROM hourly WHERE hour >= ? AND hour < ?"
+        )
+        params = [hours, hours, int(since // 3600), int((until or time.time()) // 3600) + 1]
+        if dtype:
+            sql += " AND dtype = ?"
+            params.append(dtype)
+        sql += " GROUP BY 1, 2 ORDER BY 1, 2"
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def budgets(self, since, until=None, kind="fixed", dtype=None):
+        """
+        Returns [(dtype, jobs with a budget, min, median, average, max)] per source, over
+        the whole (UTC) days from `since` to `until`.
+        """
+        sql = (
+            "SELECT dtype, budget, SUM(jobs) FROM daily_budgets "
+            "WHERE price_kind = ? AND day >= ? AND day <= ?"
+        )
+        params = [kind, int(since // 86400), int((until or time.time()) // 86400)]
+        if dtype:
+            sql += " AND dtype = ?"
+            params.append(dtype)
+        sql += " GROUP BY dtype, budget ORDER BY dtype, budget"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        histograms = {}  # dtype -> [(budget, jobs)] in budget order
+        for name, budget, count in rows:
+            histograms.setdefault(name, []).append((budget, count))
+        result = []
+        for name, histogram in histograms.items():
+            total = sum(count for _, count in histogram)
+            # Lower median: the budget where the running count passes the middle
+            seen, median = 0, None
+            for budget, count in histogram:
+                seen += count
+                if seen * 2 >= total:
+                    median = budget
+                    break
+            average = sum(budget * count for budget, count in histogram) / total
+            result.append((name, total, histogram[0][0], median, average, histogram[-1][0]))
+        return result
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def parse_since(text, now=None):
+    """
+    "7d", "12h", "30m" (that long ago) or a date "2024-05-01" -> epoch seconds.
+    """
+    now = time.time() if now is None else now
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([dhm])", text.strip())
+    if match:
+        return now - float(match.group(1)) * {"d": 86400, "h": 3600, "m": 60}[match.group(2)]
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text.strip(), fmt))
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"expected e.g. 7d, 12h or 2024-05-01, got {text!r}")
+
+
+def _table(header, rows):
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(str(h)), *(len(row[i]) for row in rows)) if rows else len(str(h)) for i, h in enumerate(header)]
+    lines = ["  ".join(str(h).ljust(w) for h, w in zip(header, widths))]
+    lines += ["  ".join(cell.rjust(w) if i else cell.ljust(w) for i, (cell, w) in enumerate(zip(row, widths)))
+              for row in rows]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local job history")
+    parser.add_argument("--db", default=HISTORY_DB_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    counts = commands.add_parser("counts", help="jobs per source and hour (or day)")
+    counts.add_argument("--since", type=parse_since, default="7d", help="e.g. 7d, 12h or 2024-05-01 (default 7d)")
+    counts.add_argument("--dtype", help="one source, e.g. Lancers_AI")
+    counts.add_argument("--by", choices=("hour", "day", "total"), default="hour")
+
+    budgets = commands.add_parser("budgets", help="budget min / median / average / max per source")
+    budgets.add_argument("--since", type=parse_since, default="30d",
+                         help="e.g. 30d or 2024-05-01, counted in whole days (default 30d)")
+    budgets.add_argument("--dtype", help="one source, e.g. CW_AI")
+    budgets.add_argument("--kind", choices=("fixed", "hourly"), default="fixed")
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist yet, the bot creates it on its first cycle")
+    store = HistoryStore(args.db)
+    start = time.perf_counter()
+
+    if args.command == "counts":
+        if args.by == "total":
+            rows = store.counts(args.since, dtype=args.dtype, bucket=None)
+            rows = [row[1:] for row in rows]
+            header = ["source", "jobs", "published", "filtered", "duplicate"]
+        else:
+            fmt = "%Y-%m-%d %H:00" if args.by == "hour" else "%Y-%m-%d"
+            # Day buckets are UTC days, hour buckets are shown in local time
+            rows = [(time.strftime(fmt, time.localtime(row[0])), *row[1:])
+                    for row in store.counts(args.since, dtype=args.dtype, bucket=3600 if args.by == "hour" else 86400)]
+            header = [args.by, "source", "jobs", "published", "filtered", "duplicate"]
+    else:
+        rows = [(name, count, low, median, f"{average:.0f}", high)
+                for name, count, low, median, average, high in store.budgets(args.since, kind=args.kind, dtype=args.dtype)]
+        header = ["source", "jobs", "min", "median", "average", "max"]
+
+    elapsed = time.perf_counter() - start
+    print(_table(header, rows))
+    print(f"({len(rows)} rows, {elapsed * 1000:.1f} ms)", file=sys.stderr)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
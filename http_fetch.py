@@ -0,0 +1,96 @@
+# http_fetch.py
+import os
+import threading
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+
+HTTP_TIMEOUT = 15
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36"
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+# url -> (ETag, Last-Modified, body) of the last 200 response that carried validators
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def cw_fetch_mode() -> str:
+    """
+    Fetch mode for Crowdworks listings: "http" (browserless, Chrome as fallback) or "browser".
+    """
+    return os.getenv("CW_FETCH_MODE", "http").lower()
+
+
+def proxy_url():
+    """
+    Builds the authenticated proxy URL from the same .env settings used by init_driver_with_proxy.
+    """
+    proxy_address = os.getenv("proxy_address")
+    proxy_username = os.getenv("proxy_username")
+    proxy_password = os.getenv("proxy_password")
+    if not proxy_address:
+        return None
+    if proxy_username and proxy_password:
+        return f"http://{quote(proxy_username, safe='')}:{quote(proxy_password, safe='')}@{proxy_address}"
+    return f"http://{proxy_address}"
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared, connection-pooled HTTP session routed through the proxy.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=1)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept-Language": "ja,en;q=0.8",
+            })
+            proxy = proxy_url()
+            if proxy:
+                session.proxies.update({"http": proxy, "https": proxy})
+            _session = session
+        return _session
+
+
+def fetch_html(url, timeout=None, source="all"):
+    """
+    Fetches a page and returns its HTML, or raises requests.RequestException.
+    Uses a conditional GET when the server sent ETag/Last-Modified before; on
+    304 Not Modified the previously fetched body is returned. `source` labels the metrics.
+    """
+    timeout = timeout or float(os.getenv("HTTP_FETCH_TIMEOUT", HTTP_TIMEOUT))
+    headers = {}
+    with _validators_lock:
+        cached = _validators.get(url)
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    resp = get_session().get(url, timeout=timeout, headers=headers)
+    if resp.status_code == 304 and cached:
+        metrics.incr("http_not_modified", source)
+        return cached[2]
+    resp.raise_for_status()
+
+    etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    with _validators_lock:
+        if etag or last_modified:
+            _validators[url] = (etag, last_modified, resp.text)
+        else:
+            _validators.pop(url, None)
+    return resp.text
@@ -0,0 +1,110 @@
+# lean_mode.py
+import os
+import json
+import logging
+import metrics
+import eventlog
+
+# URL patterns blocked per resource type (Network.setBlockedURLs only matches URLs)
+BLOCKED_TYPE_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.avif"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "stylesheet": ["*.css"],
+    "media": ["*.mp4", "*.webm", "*.mp3"],
+}
+
+# Ad, analytics and tracking hosts seen on the Lancers and Crowdworks pages
+DEFAULT_BLOCKED_HOSTS = [
+    "googletagmanager.com", "google-analytics.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "facebook.net", "ads-twitter.com", "criteo.com", "criteo.net",
+    "clarity.ms", "hotjar.com", "optimizely.com", "karte.io", "adsrvr.org",
+]
+
+# Rough transfer size of a blocked request by type, used to estimate bytes saved
+TYPICAL_BYTES = {"image": 30_000, "font": 40_000, "stylesheet": 25_000, "media": 200_000, "script": 60_000}
+
+
+def is_enabled() -> bool:
+    return os.getenv("LEAN_MODE", "0") == "1"
+
+
+def blocked_patterns():
+    """
+    URL patterns to block, from LEAN_BLOCK_TYPES (comma separated resource types) and
+    LEAN_BLOCK_HOSTS (comma separated extra hosts added to the defaults).
+    """
+    types = os.getenv("LEAN_BLOCK_TYPES", "image,font,stylesheet,media").split(",")
+    hosts = DEFAULT_BLOCKED_HOSTS + [h.strip() for h in os.getenv("LEAN_BLOCK_HOSTS", "").split(",") if h.strip()]
+    patterns = []
+    for resource_type in types:
+        for pattern in BLOCKED_TYPE_PATTERNS.get(resource_type.strip(), []):
+            patterns += [pattern, pattern + "?*"]  # also match cache-busting query strings
+    patterns += [f"*://*.{host}/*" for host in hosts] + [f"*://{host}/*" for host in hosts]
+    return patterns
+
+
+def apply_options(options):
+    """
+    Enables the Chrome performance log so lean mode can measure each page load.
+    Must be called before the driver is created.
+    """
+    if is_enabled():
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def enable(driver):
+    """
+    Blocks heavy resources and third-party hosts through the DevTools protocol.
+    """
+    if not is_enabled():
+        return driver
+    patterns = blocked_patterns()
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    logging.info(f"🪶 Lean mode enabled, blocking {len(patterns)} URL patterns")
+    return driver
+
+
+def report(driver, source):
+    """
+    Summarises the requests made since the previous call from the performance log:
+    bytes transferred, requests blocked and the estimated bytes saved (blocked requests
+    are never downloaded, so their size is a guess from TYPICAL_BYTES).
+    Returns None when lean mode is off.
+    """
+    if not is_enabled():
+        return None
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        logging.debug(f"Performance log unavailable: {e}")
+        return None
+
+    types = {}
+    transferred = requests_made = blocked = saved_estimate = 0
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            requests_made += 1
+            types[params.get("requestId")] = (params.get("type") or "other").lower()
+        elif method == "Network.loadingFinished":
+            transferred += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked += 1
+            saved_estimate += TYPICAL_BYTES.get(types.get(params.get("requestId")), 10_000)
+
+    metrics.incr("lean_requests_blocked", source, blocked)
+    metrics.incr("lean_bytes_saved_estimate", source, saved_estimate)
+    metrics.incr("lean_bytes_transferred", source, transferred)
+    stats = {"requests": requests_made, "blocked": blocked, "bytes": transferred, "saved_estimate": saved_estimate}
+    eventlog.event(
+        "lean_page", message=f"🪶 {source}: {requests_made} requests, {blocked} blocked, "
+        f"{transferred / 1024:.0f} KiB transferred, an estimated {saved_estimate / 1024:.0f} KiB saved",
+        source=source, **stats,
+    )
+    return stats
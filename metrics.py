@@ -0,0 +1,199 @@
+# metrics.py
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_lock = threading.Lock()
+_counters = defaultdict(int)  # (name, source) -> value
+_histograms = {}  # (name, source) -> Histogram
+
+# Latency buckets in seconds, from a fast DOM read up to a page stuck for minutes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus style.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket containing the q-quantile (None if empty).
+        """
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def incr(name, source="all", n=1):
+    with _lock:
+        _counters[(name, source)] += n
+
+
+def get(name, source="all"):
+    with _lock:
+        return _counters.get((name, source), 0)
+
+
+def observe(name, source, seconds):
+    with _lock:
+        histogram = _histograms.get((name, source))
+        if histogram is None:
+            histogram = _histograms[(name, source)] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def timer(stage, source="all"):
+    """
+    Records the duration of the block in the `stage_seconds` histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(f"{stage}_seconds", source, time.perf_counter() - start)
+
+
+def counters():
+    """
+    Returns a copy of all counters as {name: {source: value}}.
+    """
+    result = defaultdict(dict)
+    with _lock:
+        for (name, source), value in _counters.items():
+            result[name][source] = value
+    return dict(result)
+
+
+def skip_rates():
+    """
+    Share of listing fetches per source that were skipped because nothing changed.
+    """
+    checked = counters().get("listings_checked", {})
+    return {source: get("listings_unchanged", source) / total for source, total in checked.items() if total}
+
+
+def snapshot():
+    """
+    JSON-friendly view of every counter and histogram (count, sum, mean, p50, p95).
+    """
+    with _lock:
+        histograms = defaultdict(dict)
+        for (name, source), h in _histograms.items():
+            histograms[name][source] = {
+                "count": h.count,
+                "sum": round(h.sum, 6),
+                "mean": round(h.sum / h.count, 6) if h.count else None,
+                "p50": h.quantile(0.5),
+                "p95": h.quantile(0.95),
+            }
+    return {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "counters": counters(), "histograms": dict(histograms)}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus() -> str:
+    """
+    Renders all metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    with _lock:
+        counter_items = sorted(_counters.items())
+        histogram_items = sorted(_histograms.items())
+        histogram_data = [(key, h.buckets, list(h.counts), h.count, h.sum) for key, h in histogram_items]
+
+    declared = set()
+    for (name, source), value in counter_items:
+        metric = f"jobbot_{name}_total"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} counter")
+            declared.add(metric)
+        lines.append(f'{metric}{{source="{_label(source)}"}} {value}')
+
+    for (name, source), buckets, counts, count, total in histogram_data:
+        metric = f"jobbot_{name}"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} histogram")
+            declared.add(metric)
+        cumulative = 0
+        for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{metric}_bucket{{source="{_label(source)}",le="{le}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{source="{_label(source)}"}} {total}')
+        lines.append(f'{metric}_count{{source="{_label(source)}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics"):
+            body, content_type = render_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        elif self.path.startswith("/snapshot"):
+            body, content_type = json.dumps(snapshot(), ensure_ascii=False).encode("utf-8"), "application/json"
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes of /metrics out of the console
+
+
+def start_http_server(port=None, host="127.0.0.1"):
+    """
+    Serves /metrics (Prometheus) and /snapshot (JSON) on localhost. METRICS_PORT=0 disables it.
+    Returns None (the bot keeps running) if the port is taken, e.g. by another worker.
+    """
+    port = int(os.getenv("METRICS_PORT", "9108") if port is None else port)
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.warning(f"⚠️ Metrics endpoint not started, port {port} unavailable: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"📈 Metrics available at http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def write_snapshot(path=None):
+    """
+    Writes the JSON snapshot to METRICS_SNAPSHOT_FILE (atomically).
+    """
+    path = path or os.getenv("METRICS_SNAPSHOT_FILE", "metrics_snapshot.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,224 @@
+# near_dup.py
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from seen_store import site_of
+
+NEAR_DUP_DB_FILE = os.getenv("NEAR_DUP_DB_FILE", "near_dup.db")
+# How many recent jobs are kept in the index (the oldest are evicted as new ones come in)
+NEAR_DUP_HISTORY = int(os.getenv("NEAR_DUP_HISTORY", "50000"))
+# Only jobs published within this many seconds of each other can be copies of one another
+NEAR_DUP_WINDOW = float(os.getenv("NEAR_DUP_WINDOW", str(3 * 24 * 3600)))
+# Estimated Jaccard similarity of title shingles above which two jobs are the same job
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 similarity become candidates
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3
+_MASK = (1 << 32) - 1
+
+# Every salted 64-byte blake2b digest yields 16 independent 32-bit hash functions. The
+# salts are fixed so signatures stay comparable across restarts.
+_SALTS = [f"nd{i}".encode() for i in range(NUM_PERM // 16)]
+
+# Decorations that differ between copies of the same job, e.g. 【急募】 or ★初心者歓迎★
+_TAG_RE = re.compile(r"【[^】]*】|\[[^\]]*\]|★[^★]*★")
+_NOISE_RE = re.compile(r"[\W_]+")
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize_title(title: str) -> str:
+    text = unicodedata.normalize("NFKC", title or "").lower()
+    text = _TAG_RE.sub(" ", text)
+    return _NOISE_RE.sub("", text)
+
+
+def normalize_price(price) -> tuple:
+    """
+    The numbers of a price string, e.g. "10,000 ~ 50,000" and "10000 ~ 50000" -> (10000, 50000).
+    """
+    return tuple(int(n) for n in _NUMBER_RE.findall(str(price or "").replace(",", "")))
+
+
+def shingles(text: str) -> set:
+    if len(text) <= SHINGLE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+
+
+def minhash(title: str) -> array:
+    """
+    MinHash signature of a title's character shingles (character n-grams also work for
+    Japanese, which has no word boundaries).
+    """
+    rows = []
+    for shingle in shingles(normalize_title(title)):
+        data = shingle.encode("utf-8")
+        rows.append(array("I", b"".join(hashlib.blake2b(data, digest_size=64, salt=salt).digest() for salt in _SALTS)))
+    if not rows:
+        return array("I", [_MASK] * NUM_PERM)
+    return array("I", map(min, zip(*rows)))
+
+
+def similarity(sig_a, sig_b) -> float:
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def prices_match(a: tuple, b: tuple) -> bool:
+    # Without a price on both sides ("discuss", "N/A") the titles alone are not enough
+    return bool(a) and a == b
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over the titles of recently published jobs.
+
+    Every signature is split into bands and each band is hashed into a bucket, so a
+    lookup only compares a job against the few entries sharing at least one bucket
+    instead of the whole history. Candidates are confirmed when they come from another
+    site or category, were added within `window` seconds, their estimated title
+    similarity reaches the threshold and both have the same price. Entries are persisted
+    in SQLite so duplicates of jobs notified before a restart are still caught; only the
+    `history` most recent ones are kept, in memory and on disk.
+    """
+
+    def __init__(self, path=NEAR_DUP_DB_FILE, history=NEAR_DUP_HISTORY, threshold=NEAR_DUP_THRESHOLD,
+                 window=NEAR_DUP_WINDOW):
+        self.threshold = threshold
+        self.history = max(1, history)
+        self.window = window
+        self._lock = threading.Lock()
+        self._buckets = {}  # (band, band hash) -> set of keys
+        self._entries = OrderedDict()  # (site, id) -> (signature, price numbers, dtype, url, added), oldest first
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS near_dup ("
+            "site TEXT NOT NULL, id TEXT NOT NULL, dtype TEXT, url TEXT, price TEXT, "
+            "sig BLOB NOT NULL, added REAL NOT NULL, PRIMARY KEY (site, id))"
+        )
+        rows = self._conn.execute(
+            "SELECT site, id, dtype, url, price, sig, added FROM near_dup ORDER BY added DESC LIMIT ?",
+            (self.history,),
+        ).fetchall()
+        self._conn.execute(
+            "DELETE FROM near_dup WHERE rowid NOT IN (SELECT rowid FROM near_dup ORDER BY added DESC LIMIT ?)",
+            (self.history,),
+        )
+        self._conn.commit()
+        for site, jid, dtype, url, price, blob, added in reversed(rows):
+            sig = array("I")
+            sig.frombytes(blob)
+            if len(sig) == NUM_PERM:
+                self._index((site, jid), sig, normalize_price(price), dtype, url, added)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _bands(sig):
+        for band in range(BANDS):
+            yield band, hash(tuple(sig[band * ROWS:(band + 1) * ROWS]))
+
+    def _index(self, key, sig, price, dtype, url, added):
+        self._unindex(key)
+        self._entries[key] = (sig, price, dtype, url, added)
+        for band in self._bands(sig):
+            self._buckets.setdefault(band, set()).add(key)
+
+    def _unindex(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band in self._bands(entry[0]):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _evict(self):
+        """
+        Drops the oldest entries beyond `history`. Returns their keys.
+        """
+        evicted = []
+        while len(self._entries) > self.history:
+            key = next(iter(self._entries))
+            self._unindex(key)
+            evicted.append(key)
+        return evicted
+
+    def find(self, job, sig=None):
+        """
+        Returns the key of an indexed job that is a near-duplicate of `job`, or None.
+        """
+        key = (site_of(job["dtype"]), str(job["id"]))
+        sig = sig or minhash(job["title"])
+        price = normalize_price(job.get("price"))
+        if not price:
+            return None
+        oldest = time.time() - self.window
+        with self._lock:
+            candidates = set()
+            for band in self._bands(sig):
+                candidates |= self._buckets.get(band, set())
+            candidates.discard(key)
+            best, best_score = None, self.threshold
+            for candidate in candidates:
+                other_sig, other_price, other_dtype, _, added = self._entries[candidate]
+                if other_dtype == job["dtype"] or added < oldest or not prices_match(price, other_price):
+                    continue
+                score = similarity(sig, other_sig)
+                if score >= best_score:
+                    best, best_score = candidate, score
+            return best
+
+    def describe(self, key):
+        """
+        Returns {"dtype", "url"} of an indexed job, or None if it has been evicted since.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        return {"dtype": entry[2], "url": entry[3]} if entry else None
+
+    def add(self, job, sig=None):
+        key = (site_of(job["dtype"]), str(job["id"]))
+        sig = sig or minhash(job["title"])
+        added = time.time()
+        with self._lock:
+            self._index(key, sig, normalize_price(job.get("price")), job["dtype"], job["url"], added)
+            evicted = self._evict()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO near_dup (site, id, dtype, url, price, sig, added) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key[0], key[1], job["dtype"], job["url"], job.get("price"), sig.tobytes(), added),
+            )
+            if evicted:
+                self._conn.executemany("DELETE FROM near_dup WHERE site = ? AND id = ?", evicted)
+            self._conn.commit()
+        return key
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NearDuplicateIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex()
+            logging.info(f"Near-duplicate index loaded with {len(_index)} jobs")
+        return _index
@@ -1,37 +1,131 @@
 # notifySlack.py
 import os
+import json
 import logging
+import queue
+import threading
 import requests
 import time
-from dotenv import load_dotenv
-
-load_dotenv()
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+import metrics
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
 if not SLACK_WEBHOOK_URL:
     raise ValueError("SLACK_WEBHOOK_URL is not set in environment variables")
 
-# Optionally adjust log level via environment or default
-logging.basicConfig(level=logging.INFO)
+JST = timezone(timedelta(hours=9))
 
-def notify_slack(dtype: str, price: str, title: str, url: str) -> bool:
+SLACK_SPOOL_FILE = os.getenv("SLACK_SPOOL_FILE", "slack_spool.jsonl")
+# Max jobs combined into one Block Kit message (Slack allows 50 blocks per message)
+SLACK_BATCH_SIZE = int(os.getenv("SLACK_BATCH_SIZE", "10"))
+# How long the worker waits for more jobs to arrive before sending a burst
+SLACK_BATCH_WINDOW = float(os.getenv("SLACK_BATCH_WINDOW", "2"))
+SLACK_MAX_RETRIES = int(os.getenv("SLACK_MAX_RETRIES", "5"))
+# Length of the job description excerpt included in notifications
+SLACK_DESCRIPTION_CHARS = int(os.getenv("SLACK_DESCRIPTION_CHARS", "300"))
+
+def redact(text, webhook_url=None) -> str:
     """
-    Send a Slack alert for a new job.
-    Returns True if HTTP 200, otherwise False.
+    Removes the webhook URL (and its secret path, which connection errors quote) from a message.
+    """
+    text = str(text)
+    webhook_url = webhook_url or SLACK_WEBHOOK_URL
+    if webhook_url:
+        text = text.replace(webhook_url, "<webhook>")
+        path = urlsplit(webhook_url).path
+        if len(path) > 1:
+            text = text.replace(path, "/<webhook>")
+    return text
+
+def format_copies(duplicates) -> str:
     """
-    message = (
-        f"{time.strftime('%Y-%m-%d %H:%M:%S')} : <!channel>\n"
+    Links to the other postings of a cross-posted job, e.g. "<url|CW_web>, <url|CW_AI>".
+    """
+    return ", ".join(f"<{copy['url']}|{copy['dtype']}>" for copy in duplicates or [])
+
+def excerpt(text, limit=SLACK_DESCRIPTION_CHARS) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+def format_copy_message(dtype: str, price: str, title: str, url: str, copy_of, found_at=None) -> str:
+    """
+    A short notice for a job that is a copy of one notified earlier (no @channel).
+    """
+    return (
+        f"{found_at or time.strftime('%Y-%m-%d %H:%M:%S')} : "
+        f"*[{dtype}] Copy of an earlier job* 🔁\n"
+        f"*Original:* {format_copies([copy_of])}\n"
+        f"*Price:* {price}\n"
+        f"*Title:* {title}\n"
+        f"*Link:* {url}\n"
+        f"----------------------------------------------------------"
+    )
+
+def format_message(dtype: str, price: str, title: str, url: str, found_at=None, duplicates=None,
+                   description=None, apply_url=None) -> str:
+    copies = f"*Also posted:* {format_copies(duplicates)}\n" if duplicates else ""
+    details = (f"*Apply:* {apply_url}\n" if apply_url else "") + (
+        f"*Description:* {excerpt(description)}\n" if description else ""
+    )
+    return (
+        f"{found_at or time.strftime('%Y-%m-%d %H:%M:%S')} : <!channel>\n"
         f"*New [{dtype}] job found!* 🎉\n"
         f"*Price:* {price}\n"
         f"*Title:* {title}\n"
         f"*Link:* {url}\n"
+        f"{details}"
+        f"{copies}"
         f"----------------------------------------------------------"
     )
-    
-    print(f" Attempting to send Slack notification:")
-    print(f"   Webhook URL: {SLACK_WEBHOOK_URL[:50]}..." if SLACK_WEBHOOK_URL else "   Webhook URL: NOT SET")
-    print(f"   Message: {message}")
-    
+
+def build_payload(jobs):
+    """
+    Builds a webhook payload for one or more jobs. A single job keeps the plain text
+    format, a burst is combined into one Block Kit message with a section per job.
+    """
+    if len(jobs) == 1:
+        job = jobs[0]
+        if job.get("copy_of"):
+            return {"text": format_copy_message(job["dtype"], job["price"], job["title"], job["url"], job["copy_of"],
+                                                job.get("found_at"))}
+        return {"text": format_message(job["dtype"], job["price"], job["title"], job["url"], job.get("found_at"),
+                                       job.get("duplicates"), job.get("description"), job.get("apply_url"))}
+
+    blocks = [{
+        "type": "section",
+        "text": {"type": "mrkdwn", "text": f"<!channel> *{len(jobs)} new jobs found!* 🎉"},
+    }]
+    for job in jobs:
+        blocks.append({"type": "divider"})
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": (
+                    f"*[{job['dtype']}]* <{job['url']}|{job['title'][:200]}>\n"
+                    f"*Price:* {job['price']}  ·  {job.get('found_at', '')}"
+                    + (f"  ·  <{job['apply_url']}|Apply>" if job.get("apply_url") else "")
+                    + (f"\n{excerpt(job['description'], 200)}" if job.get("description") else "")
+                    + (f"\n*Also posted:* {format_copies(job['duplicates'])}" if job.get("duplicates") else "")
+                    + (f"\n🔁 *Copy of:* {format_copies([job['copy_of']])}" if job.get("copy_of") else "")
+                ),
+            },
+        })
+    return {
+        "text": f"{len(jobs)} new jobs found: " + ", ".join(f"[{job['dtype']}] {job['title'][:60]}" for job in jobs),
+        "blocks": blocks,
+    }
+
+def notify_slack(dtype: str, price: str, title: str, url: str) -> bool:
+    """
+    Send a Slack alert for a new job.
+    Returns True if HTTP 200, otherwise False.
+    """
+    message = format_message(dtype, price, title, url)
+    # Never log the webhook URL, it is the only credential needed to post to the channel
+    logging.debug(f"Sending Slack notification for [{dtype}] {url}")
+
     payload = {"text": message}
     try:
         resp = requests.post(
@@ -40,18 +134,209 @@ def notify_slack(dtype: str, price: str, title: str, url: str) -> bool:
             json=payload,
             timeout=10
         )
-        print(f"   Response status: {resp.status_code}")
-        print(f"   Response text: {resp.text}")
-        
         if resp.status_code == 200:
-            print("✅ Slack notification sent successfully")
-            logging.info("✅ Slack notification sent successfully")
+            logging.debug("✅ Slack notification sent successfully")
             return True
         else:
-            print(f"❌ Slack notification failed: {resp.status_code}, {resp.text}")
             logging.error(f"❌ Slack notification failed: {resp.status_code}, {resp.text}")
             return False
     except requests.RequestException as e:
-        print(f"❌ Slack notification error: {e}")
-        logging.error(f"❌ Slack notification error: {e}")
+        logging.error(f"❌ Slack notification error: {redact(e)}")
         return False
+
+def parse_timestamp(value):
+    """
+    Converts an ISO 8601 timestamp (as found in listing JSON) to epoch seconds, or None.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=JST)
+    return parsed.timestamp()
+
+def record_delivery(jobs):
+    now = time.time()
+    for job in jobs:
+        metrics.incr("jobs_notified", job["dtype"])
+        if job.get("found_ts"):
+            metrics.observe("found_to_notified_seconds", job["dtype"], now - job["found_ts"])
+        posted_ts = parse_timestamp(job.get("posted_at"))
+        if posted_ts:
+            metrics.observe("posted_to_notified_seconds", job["dtype"], now - posted_ts)
+
+class SlackDispatcher:
+    """
+    Queues job notifications and sends them from a background thread over a persistent
+    session. Bursts are combined into multi-job messages, rate limits (429 + Retry-After)
+    and transient errors are retried with backoff, and anything not yet delivered is kept
+    in a JSONL spool so it survives restarts.
+    """
+
+    def __init__(self, webhook_url=SLACK_WEBHOOK_URL, spool_file=SLACK_SPOOL_FILE,
+                 batch_size=SLACK_BATCH_SIZE, batch_window=SLACK_BATCH_WINDOW):
+        self.webhook_url = webhook_url
+        self.spool_file = spool_file
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self._queue = queue.Queue()
+        self._spool_lock = threading.Lock()
+        self._pending = {}  # spool id -> job, everything queued but not yet delivered
+        self._next_id = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="slack-dispatcher", daemon=True)
+
+        # Replay jobs left undelivered by a previous run
+        for job in self._read_spool():
+            self._enqueue(job, persist=False)
+        if self._pending:
+            logging.info(f"📨 Replaying {len(self._pending)} undelivered Slack notifications")
+        self._rewrite_spool()
+        self._thread.start()
+
+    def notify(self, dtype, price, title, url, found_ts=None, posted_at=None, duplicates=None,
+               description=None, apply_url=None, copy_of=None):
+        """
+        Queues a job notification and returns immediately.
+        found_ts (epoch seconds) and posted_at (ISO 8601) feed the latency metrics,
+        duplicates lists the other postings ({"dtype", "url"}) of a cross-posted job,
+        description and apply_url come from the prefetched detail page, copy_of is the
+        earlier posting ({"dtype", "url"}) of a job notified before.
+        """
+        self._enqueue({
+            "dtype": dtype, "price": price, "title": title, "url": url,
+            "found_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "found_ts": found_ts or time.time(),
+            "posted_at": posted_at,
+            "duplicates": duplicates or [],
+            "description": description,
+            "apply_url": apply_url,
+            "copy_of": copy_of,
+        })
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self, timeout=None):
+        """
+        Blocks until the queue is drained (or the timeout expires).
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while self._pending and (deadline is None or time.time() < deadline):
+            time.sleep(0.1)
+        return not self._pending
+
+    def stop(self, timeout=10):
+        self.flush(timeout)
+        self._stopping.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _enqueue(self, job, persist=True):
+        with self._spool_lock:
+            job_id = self._next_id
+            self._next_id += 1
+            self._pending[job_id] = job
+            if persist:
+                with open(self.spool_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(job, ensure_ascii=False) + "\n")
+        self._queue.put(job_id)
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_file):
+            return []
+        jobs = []
+        with open(self.spool_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    jobs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return jobs
+
+    def _rewrite_spool(self):
+        with self._spool_lock:
+            tmp = self.spool_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for job in self._pending.values():
+                    f.write(json.dumps(job, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.spool_file)
+
+    def _next_batch(self):
+        job_id = self._queue.get()
+        if job_id is None:
+            return []
+        batch = [job_id]
+        deadline = time.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            try:
+                job_id = self._queue.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if job_id is None:
+                self._stopping.set()
+                break
+            batch.append(job_id)
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            jobs = [self._pending[job_id] for job_id in batch]
+            with metrics.timer("notify"):
+                delivered = self._send(build_payload(jobs))
+            if delivered is None:
+                # Slack is unreachable: keep the jobs spooled and try again later
+                time.sleep(60)
+                for job_id in batch:
+                    self._queue.put(job_id)
+                continue
+            if delivered:
+                record_delivery(jobs)
+            with self._spool_lock:
+                for job_id in batch:
+                    self._pending.pop(job_id, None)
+            self._rewrite_spool()
+
+    def _send(self, payload):
+        """
+        Posts a payload. Returns True when delivered, False when Slack rejected it
+        (it will never succeed, so it is dropped) and None when retries ran out.
+        """
+        delay = 1
+        for attempt in range(1, SLACK_MAX_RETRIES + 1):
+            try:
+                resp = self.session.post(self.webhook_url, json=payload, timeout=10)
+                if resp.status_code == 200:
+                    logging.debug("✅ Slack notification sent")
+                    return True
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    wait = float(resp.headers.get("Retry-After", delay))
+                    logging.warning(f"⏳ Slack returned {resp.status_code}, retrying in {wait}s (attempt {attempt})")
+                    time.sleep(wait)
+                    delay = min(delay * 2, 60)
+                    continue
+                logging.error(f"❌ Slack notification failed: {resp.status_code}, {resp.text}")
+                return False
+            except requests.RequestException as e:
+                logging.error(f"❌ Slack notification error: {redact(e)} (attempt {attempt})")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+        return None
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> SlackDispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = SlackDispatcher()
+        return _dispatcher
@@ -0,0 +1,339 @@
+# pipeline.py
+import os
+import time
+import queue
+import logging
+import threading
+from seen_store import site_of
+from near_dup import get_index, minhash
+from rules import get_rules
+import eventlog
+import metrics
+
+
+def pipeline_config_from_env():
+    return {
+        "queue_size": int(os.getenv("PIPELINE_QUEUE_SIZE", "200")),
+        "translate_batch": int(os.getenv("PIPELINE_TRANSLATE_BATCH", "25")),
+        # How long the translate stage waits for other sources to add to a batch
+        "batch_linger": float(os.getenv("PIPELINE_BATCH_LINGER", "0.3")),
+        # Stop pulling new jobs while this many Slack notifications are undelivered
+        "slack_max_pending": int(os.getenv("PIPELINE_SLACK_MAX_PENDING", "100")),
+    }
+
+
+class JobPipeline:
+    """
+    Streams scraped jobs through dedup -> translate -> publish (Slack + Sheets).
+
+    Dedup runs inline in submit(): it is an in-memory lookup and its result (how many jobs
+    are new) feeds the adaptive scheduler. Translation and publishing run on their own
+    threads behind bounded queues, so each source's jobs flow on as soon as that source
+    returns. When a sink falls behind, the queues fill up and submit() blocks, which slows
+    the scrapers down instead of piling up work in memory.
+
+    A job is claimed in the seen store right before it is published, so it is notified
+    at most once even if several sources report it at the same time.
+
+    Before translation, jobs failing the filters of rules.json are dropped and the rest are
+    scored (see rules.RuleEngine). Jobs whose title and price match a job of another site or category
+    (a cross-post with a different id) are collapsed: copies in the same batch are folded
+    into one notification with links to each copy, a copy of an already published job gets
+    a short Slack message pointing to the earlier notification instead of a full one.
+
+    With a DetailPrefetcher, the detail pages of the remaining jobs start loading in the
+    background while they are translated, and their description and apply URL are added
+    to the notification. A job whose page is still loading waits in the publish stage
+    without holding up the jobs behind it, which are published as soon as they are ready.
+
+    With a HistoryStore, every scraped job (new or not) is recorded in submit() and its
+    outcome (published, filtered or duplicate) is added once it is known.
+
+    With a Bidder, qualifying jobs go down the bid fast path (see bidding.Bidder) right
+    after their detail pages start loading, without waiting for translation.
+    """
+
+    def __init__(self, seen, config=None, prefetcher=None, history=None, bidder=None):
+        self.seen = seen
+        self.prefetcher = prefetcher
+        self.history = history
+        self.bidder = bidder
+        self.config = dict(config or pipeline_config_from_env())
+        self._translate_queue = queue.Queue(maxsize=self.config["queue_size"])
+        self._publish_queue = queue.Queue(maxsize=self.config["queue_size"])
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._translate_stage, name="pipeline-translate", daemon=True),
+            threading.Thread(target=self._publish_stage, name="pipeline-publish", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, jobs) -> int:
+        """
+        Dedups a source's scraped jobs and queues the new ones. Returns how many were new.
+        Blocks while the pipeline is full. Raises RuntimeError if a stage thread has died.
+        """
+        self._check_stages()
+        if self.history:
+            try:
+                with metrics.timer("history"):
+                    self.history.record(jobs)
+            except Exception as e:
+                logging.error(f"History store error: {e}")
+        fresh = []
+        with self._inflight_lock:
+            for job in jobs:
+                key = (site_of(job["dtype"]), str(job["id"]))
+                if (job["dtype"], job["id"]) in self.seen or key in self._inflight:
+                    continue
+                self._inflight.add(key)
+                fresh.append(job)
+        for job in fresh:
+            metrics.incr("jobs_new", job["dtype"])
+            while True:
+                try:
+                    self._translate_queue.put(job, timeout=1)
+                    break
+                except queue.Full:
+                    self._check_stages()
+        return len(fresh)
+
+    def drain(self, timeout=None):
+        """
+        Waits until every submitted job has been published. Raises RuntimeError if a stage
+        thread has died, as the remaining jobs would never be.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while deadline is None or time.time() < deadline:
+            with self._inflight_lock:
+                if not self._inflight:
+                    return True
+            self._check_stages()
+            time.sleep(0.1)
+        return False
+
+    def _check_stages(self):
+        for thread in self._threads:
+            if not thread.is_alive():
+                raise RuntimeError(f"Pipeline stage {thread.name} has stopped, see the log for its error")
+
+    def _next_batch(self):
+        batch = [self._translate_queue.get()]
+        deadline = time.time() + self.config["batch_linger"]
+        while len(batch) < self.config["translate_batch"]:
+            try:
+                batch.append(self._translate_queue.get(timeout=max(0, deadline - time.time())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _collapse_duplicates(self, batch):
+        """
+        Returns the jobs of a batch that are not near-duplicates, with the links of their
+        copies in job["duplicates"], followed by the copies of earlier jobs, which carry
+        the original ({"dtype", "url"}) in job["copy_of"].
+        """
+        index = get_index()
+        primaries = {}  # index key -> job, for the jobs of this batch
+        late_copies = []
+        for job in batch:
+            sig = minhash(job["title"])
+            match = index.find(job, sig)
+            if match is None:
+                primaries[index.add(job, sig)] = job
+                continue
+
+            metrics.incr("jobs_near_duplicate", job["dtype"])
+            self._set_status(job, "duplicate")
+            if match in primaries:
+                primaries[match].setdefault("duplicates", []).append({"dtype": job["dtype"], "url": job["url"]})
+                self._skip(job)
+                continue
+            original = index.describe(match)
+            if original is None:
+                self._skip(job)
+                continue
+            eventlog.event("job_near_duplicate", dtype=job["dtype"], id=job["id"], url=job["url"],
+                           original=original["url"], original_dtype=original["dtype"])
+            late_copies.append(dict(job, copy_of=original))
+        return list(primaries.values()) + late_copies
+
+    def _filter(self, batch):
+        kept, dropped = get_rules().evaluate(batch)
+        for job in dropped:
+            metrics.incr("jobs_filtered", job["dtype"])
+            self._set_status(job, "filtered")
+            eventlog.event("job_filtered", dtype=job["dtype"], id=job["id"], title=job["title"], price=job["price"])
+            self._skip(job)
+        return kept
+
+    def _set_status(self, job, status):
+        if self.history:
+            try:
+                self.history.set_status(job, status, job.get("score"))
+            except Exception as e:
+                logging.error(f"History store error: {e}")
+
+    def _skip(self, job):
+        """
+        Records a job that will not be published as seen, so later polls ignore it.
+        """
+        self.seen.add({
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "dtype": job["dtype"],
+            "id": job["id"],
+            "type": job["type"],
+            "title": job["title"],
+            "url": job["url"],
+            "price": job["price"],
+        })
+        self._done(job)
+
+    def _done(self, job):
+        with self._inflight_lock:
+            self._inflight.discard((site_of(job["dtype"]), str(job["id"])))
+
+    def _translate_stage(self):
+        while True:
+            batch = []
+            try:
+                batch = self._next_batch()
+                self._translate_batch(batch)
+            except Exception:
+                logging.exception("Translate stage error")
+                # Not published, so the next poll picks these jobs up again
+                for job in batch:
+                    self._done(job)
+
+    def _translate_batch(self, batch):
+        try:
+            with metrics.timer("rules"):
+                batch = self._filter(batch)
+        except Exception as e:
+            logging.error(f"Rule engine error: {e}")
+        try:
+            with metrics.timer("near_dup"):
+                batch = self._collapse_duplicates(batch)
+        except Exception as e:
+            logging.error(f"Near-duplicate check error: {e}")
+        if not batch:
+            return
+        # Copies of earlier jobs are only announced, they need no details or bids
+        originals = [job for job in batch if not job.get("copy_of")]
+        if self.prefetcher:
+            for job in originals:
+                try:
+                    self.prefetcher.prefetch(job)
+                except Exception as e:
+                    logging.error(f"Prefetch error for {job['dtype']} {job['id']}: {e}")
+        if self.bidder:
+            # Bids start before translation and publishing, early proposals win
+            for job in originals:
+                try:
+                    self.bidder.consider(job)
+                except Exception as e:
+                    logging.error(f"Bid error for {job['dtype']} {job['id']}: {e}")
+        try:
+            # Imported on first use (deep_translator is slow to load)
+            from translate import translate_many
+
+            with metrics.timer("translate"):
+                titles = translate_many([job["title"] for job in batch])
+        except Exception as e:
+            logging.error(f"Translation stage error: {e}")
+            titles = [job["title"] for job in batch]
+        for job, title in zip(batch, titles):
+            if title != job["title"]:
+                metrics.incr("jobs_translated", job["dtype"])
+            self._publish_queue.put(dict(job, title=title))
+
+    def _publish_stage(self):
+        from notifySlack import get_dispatcher
+
+        dispatcher = get_dispatcher()
+        waiting = []  # jobs whose detail page is still loading, in arrival order
+        while True:
+            try:
+                # Poll while jobs are waiting for their details, so they go out as soon as ready
+                waiting.append(self._publish_queue.get(timeout=0.1 if waiting else None))
+                while True:
+                    waiting.append(self._publish_queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                ready, waiting = self._split_ready(waiting)
+            except Exception:
+                logging.exception("Publish stage error")
+                ready, waiting = waiting, []
+            for job in ready:
+                try:
+                    # Backpressure from Slack: hold further jobs until the dispatcher catches up
+                    while dispatcher.pending() >= self.config["slack_max_pending"]:
+                        time.sleep(0.5)
+                    self._publish(job, dispatcher)
+                except Exception:
+                    logging.exception(f"Publish stage error for {job.get('dtype')} {job.get('id')}")
+                finally:
+                    self._done(job)
+
+    def _split_ready(self, jobs):
+        """
+        Splits jobs into those that can be published now and those still waiting for details.
+        """
+        if not self.prefetcher:
+            return jobs, []
+        ready, waiting = [], []
+        for job in jobs:
+            try:
+                is_ready = self.prefetcher.ready(job)
+            except Exception as e:
+                logging.error(f"Prefetch error for {job['dtype']} {job['id']}: {e}")
+                is_ready = True
+            (ready if is_ready else waiting).append(job)
+        return ready, waiting
+
+    def _publish(self, job, dispatcher):
+        dtype, jid, job_type, title, price, url = job["dtype"], job["id"], job["type"], job["title"], job["price"], job["url"]
+        found_at = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        # Claim the job in the seen store first, sources checked in parallel may report the same job
+        if not self.seen.add({
+            "time": found_at,
+            "dtype": dtype,
+            "id": jid,
+            "type": job_type,
+            "title": title,
+            "url": url,
+            "price": price,
+        }):
+            return
+
+        if job.get("copy_of"):
+            dispatcher.notify(dtype, price, title, url, found_ts=job.get("found_ts"), posted_at=job.get("posted_at"),
+                              copy_of=job["copy_of"])
+            return
+
+        detail = (self.prefetcher.detail(job) if self.prefetcher else None) or {}
+
+        self._set_status(job, "published")
+        # File only, the console gets the per-cycle summary (see eventlog.CycleSummary)
+        eventlog.event(
+            "job_published", message=f"✨ New job [{dtype}] {title}", time=found_at, dtype=dtype, id=jid,
+            price=price, job_type=job_type, score=job.get("score"), title=title, url=url,
+            apply_url=detail.get("apply_url"), duplicates=[copy["url"] for copy in job.get("duplicates", [])],
+        )
+
+        dispatcher.notify(dtype, price, title, url, found_ts=job.get("found_ts"), posted_at=job.get("posted_at"),
+                          duplicates=job.get("duplicates"), description=detail.get("description"),
+                          apply_url=detail.get("apply_url"))
+        from update_sheet import get_sheet_writer
+
+        get_sheet_writer().append([{
+            "time": found_at,
+            "dtype": dtype,
+            "url": url,
+            "price": price,
+            "title": title,
+        }])
@@ -0,0 +1,144 @@
+# prefetch.py
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from seen_store import site_of
+from sources import adapter_for
+import metrics
+
+
+def prefetch_config_from_env():
+    return {
+        "workers": max(1, int(os.getenv("DETAIL_WORKERS", "2"))),
+        # Per-element wait on a detail page (the old sequential path waited 60s)
+        "timeout": float(os.getenv("DETAIL_TIMEOUT", "20")),
+        "ttl": float(os.getenv("DETAIL_CACHE_TTL", "3600")),
+        "max_entries": int(os.getenv("DETAIL_CACHE_SIZE", "2000")),
+        # How long publishing may wait for a detail page, counted from the prefetch start
+        "max_wait": float(os.getenv("DETAIL_MAX_WAIT", "30")),
+    }
+
+
+class DetailCache:
+    """
+    In-memory cache of job detail pages keyed by (site, id), entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}  # key -> (expires, detail)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key, detail):
+        with self._lock:
+            now = time.time()
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: e for k, e in self._entries.items() if e[0] >= now}
+                # Still full: drop the entries closest to expiry
+                for k, _ in sorted(self._entries.items(), key=lambda item: item[1][0])[:len(self._entries) // 10 + 1]:
+                    del self._entries[k]
+            self._entries[key] = (now + self.ttl, detail)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DetailPrefetcher:
+    """
+    Loads the detail pages (description + apply URL) of new jobs in the background.
+
+    Detail pages run on a bounded worker pool with browser sessions reserved for them in
+    the DriverPool, so the listing scrapers never wait for a detail page. The pipeline
+    calls prefetch() as soon as a job has passed the filters, holds the job back until
+    ready() and then calls detail() to publish it. A job is ready once its page is in or
+    `max_wait` seconds after the prefetch started, whichever comes first.
+    """
+
+    def __init__(self, pool, config=None):
+        self.pool = pool
+        self.config = dict(config or prefetch_config_from_env())
+        self.cache = DetailCache(self.config["ttl"], self.config["max_entries"])
+        self._executor = ThreadPoolExecutor(max_workers=self.config["workers"], thread_name_prefix="detail")
+        self._futures = {}  # key -> (started, future)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(job):
+        return (site_of(job["dtype"]), str(job["id"]))
+
+    def supports(self, job) -> bool:
+        adapter = adapter_for(job["dtype"])
+        return bool(adapter.detail_sessions) and adapter.detail_site in self.pool.limits
+
+    def prefetch(self, job):
+        """
+        Starts loading a job's detail page unless it is cached or already loading.
+        """
+        if not self.supports(job):
+            return
+        key = self._key(job)
+        if self.cache.get(key) is not None:
+            return
+        with self._lock:
+            if key not in self._futures:
+                self._futures[key] = (time.time(), self._executor.submit(self._fetch, key, job))
+
+    def _fetch(self, key, job):
+        adapter = adapter_for(job["dtype"])
+        try:
+            with metrics.timer("detail", job["dtype"]):
+                adapter.budget.take()
+                with self.pool.session(adapter.detail_site) as driver:
+                    detail = adapter.fetch_detail(driver, job, self.config["timeout"])
+            self.cache.put(key, detail)
+            metrics.incr("details_fetched", job["dtype"])
+            return detail
+        except Exception as e:
+            metrics.incr("detail_errors", job["dtype"])
+            logging.error(f"⚠️ Could not load detail page of {job['dtype']} {job['id']}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    def ready(self, job) -> bool:
+        """
+        True once detail() would return without waiting. Never blocks.
+        """
+        with self._lock:
+            started, future = self._futures.get(self._key(job), (None, None))
+        return future is None or future.done() or time.time() >= started + self.config["max_wait"]
+
+    def detail(self, job):
+        """
+        Returns the cached or prefetched {"description", "apply_url"} of a job, or None.
+        """
+        key = self._key(job)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            started, future = self._futures.get(key, (None, None))
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=max(0, started + self.config["max_wait"] - time.time()))
+        except Exception:
+            # Not ready in time, publish without it (the page still lands in the cache)
+            return None
+
+    def stop(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
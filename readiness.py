@@ -0,0 +1,161 @@
+# readiness.py
+import os
+import time
+import logging
+import threading
+from collections import deque
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import metrics
+
+
+def readiness_config_from_env():
+    return {
+        # Learned timeout = factor x the slowest of the recent load times (95th percentile)
+        "factor": float(os.getenv("READY_TIMEOUT_FACTOR", "3")),
+        "min_timeout": float(os.getenv("READY_MIN_TIMEOUT", "5")),
+        "max_timeout": float(os.getenv("READY_MAX_TIMEOUT", "60")),
+        # Upper bound for driver.get(), the driver is created with this page load timeout
+        "page_load_timeout": float(os.getenv("PAGE_LOAD_TIMEOUT", "60")),
+        "samples": int(os.getenv("READY_SAMPLES", "50")),
+        # Below this many samples the caller's default timeout is used
+        "min_samples": int(os.getenv("READY_MIN_SAMPLES", "5")),
+    }
+
+
+class LearnedTimeouts:
+    """
+    Per-source timeouts derived from how long that source's pages actually take.
+
+    Keeps the last `samples` durations per (stage, source) and sets the timeout to
+    `factor` times their 95th percentile, clamped to [min_timeout, max_timeout]. A fast
+    source stops getting the minute-long allowance it never needs, so one hung page costs
+    seconds instead of a minute. A timeout counts as a sample of twice the timeout it hit,
+    so a source that really got slower earns a longer timeout after a few misses instead
+    of timing out forever.
+    """
+
+    def __init__(self, config=None):
+        self.config = dict(config or readiness_config_from_env())
+        self._samples = {}  # (stage, source) -> deque of seconds
+        self._lock = threading.Lock()
+
+    def record(self, stage, source, seconds):
+        with self._lock:
+            samples = self._samples.get((stage, source))
+            if samples is None:
+                samples = self._samples[(stage, source)] = deque(maxlen=self.config["samples"])
+            samples.append(seconds)
+
+    def expired(self, stage, source, timeout):
+        metrics.incr(f"{stage}_timeouts", source)
+        self.record(stage, source, timeout * 2)
+
+    def get(self, stage, source, default, limit=None):
+        """
+        The learned timeout in seconds, or `default` until enough samples are in.
+        Never more than `limit` (default max_timeout).
+        """
+        limit = self.config["max_timeout"] if limit is None else limit
+        with self._lock:
+            samples = sorted(self._samples.get((stage, source), ()))
+        if len(samples) < self.config["min_samples"]:
+            return min(default, limit)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return min(max(p95 * self.config["factor"], self.config["min_timeout"]), limit)
+
+    def snapshot(self):
+        """
+        {"stage source": learned timeout} for the status report.
+        """
+        with self._lock:
+            keys = [key for key, samples in self._samples.items() if len(samples) >= self.config["min_samples"]]
+        return {f"{stage} {source}": round(self.get(stage, source, 0), 1) for stage, source in keys}
+
+
+TIMEOUTS = LearnedTimeouts()
+
+# Resolves as soon as the condition (a function body) returns something other than
+# null / undefined / false / "", re-checking on every DOM mutation and on the load event.
+# Resolves with null when `timeout` ms pass first.
+WAIT_FOR_JS = """
+var condition = new Function(arguments[0]);
+var timeout = arguments[1];
+var done = arguments[arguments.length - 1];
+var finished = false, observer = null, timer = null;
+function finish(value) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearTimeout(timer);
+    window.removeEventListener('load', check);
+    done(value);
+}
+function check() {
+    var value = null;
+    try { value = condition(); } catch (e) {}
+    if (value !== null && value !== undefined && value !== false && value !== '') finish(value);
+}
+check();
+if (!finished) {
+    observer = new MutationObserver(check);
+    observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    window.addEventListener('load', check);
+    timer = setTimeout(function () { finish(null); }, timeout);
+}
+"""
+
+
+def wait_for(driver, condition_js, source, default=30, limit=None):
+    """
+    Runs `condition_js` (a JS function body) in the page whenever the DOM changes and
+    returns its first usable result, or None if the learned timeout for `source` runs
+    out first. A single execute_async_script round trip replaces polling.
+    """
+    timeout = TIMEOUTS.get("wait", source, default, limit)
+    started = time.perf_counter()
+    deadline = started + timeout
+    result = None
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            driver.set_script_timeout(remaining + 5)
+            result = driver.execute_async_script(WAIT_FOR_JS, condition_js, int(remaining * 1000))
+            break
+        except TimeoutException:
+            break
+        except WebDriverException as e:
+            # The page navigated (e.g. a redirect) while we were waiting, watch the new one
+            if "unload" not in str(e).lower() and "context" not in str(e).lower():
+                raise
+            time.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    metrics.observe("wait_seconds", source, elapsed)
+    if result is None:
+        TIMEOUTS.expired("wait", source, timeout)
+        logging.debug(f"⌛ {source} not ready after {timeout:.1f}s")
+    else:
+        TIMEOUTS.record("wait", source, elapsed)
+    return result
+
+
+def load(driver, url, source):
+    """
+    driver.get() with the page load timeout learned for `source`. A page that takes
+    longer is stopped and whatever has loaded is used. Returns False if it timed out.
+    """
+    limit = TIMEOUTS.config["page_load_timeout"]
+    timeout = TIMEOUTS.get("page_load", source, limit, limit)
+    started = time.perf_counter()
+    with metrics.timer("page_load", source):
+        try:
+            driver.set_page_load_timeout(timeout)
+            driver.get(url)
+        except TimeoutException:
+            TIMEOUTS.expired("page_load", source, timeout)
+            logging.warning(f"⚠️ {source} page load exceeded {timeout:.0f}s, proceeding by stopping load.")
+            driver.execute_script("window.stop();")
+            return False
+    TIMEOUTS.record("page_load", source, time.perf_counter() - started)
+    return True
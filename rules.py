@@ -0,0 +1,145 @@
+# rules.py
+import os
+import re
+import json
+import logging
+import threading
+import unicodedata
+
+RULES_FILE = os.getenv("RULES_FILE", "rules.json")
+
+
+class RuleEngine:
+    """
+    Filters and scores a batch of jobs before they are translated and notified.
+
+    Rules come from a JSON file, every key is optional:
+
+        {
+            "categories": ["Lancers_system", "CW_AI"],         only these sources
+            "exclude_keywords": ["データ入力", "アンケート"],      drop titles containing any
+            "require_keywords": ["Python", "AI"],              keep titles containing at least one
+            "min_budget": {"fixed": 30000, "hourly": 1500},    drop jobs whose max price is lower
+            "scores": [
+                {"keywords": ["AI", "LLM"], "score": 2},
+                {"min_budget": 100000, "kind": "fixed", "score": 1},
+                {"categories": ["CW_AI"], "score": 1}
+            ],
+            "min_score": 0                                      drop jobs scoring less
+        }
+
+    Keywords match case-insensitively on the NFKC-normalized Japanese title. Jobs without
+    a price (e.g. "discuss") pass budget filters. Every rule is evaluated as a column over
+    the whole batch: all keyword lists are compiled into one regex each, and each title
+    is scanned once per list instead of once per keyword.
+    """
+
+    def __init__(self, rules=None):
+        rules = rules or {}
+        self.categories = set(rules.get("categories") or [])
+        self.exclude = self._compile(rules.get("exclude_keywords"))
+        self.require = self._compile(rules.get("require_keywords"))
+        self.min_budget = dict(rules.get("min_budget") or {})
+        self.min_score = rules.get("min_score")
+        self.scores = []
+        for rule in rules.get("scores") or []:
+            self.scores.append({
+                "keywords": self._compile(rule.get("keywords")),
+                "categories": set(rule.get("categories") or []),
+                "min_budget": rule.get("min_budget"),
+                "kind": rule.get("kind"),
+                "score": float(rule.get("score", 1)),
+            })
+
+    @staticmethod
+    def _compile(keywords):
+        keywords = [unicodedata.normalize("NFKC", k).lower() for k in keywords or [] if k]
+        if not keywords:
+            return None
+        return re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+
+    @classmethod
+    def load(cls, path=RULES_FILE):
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _budget_ok(max_prices, kinds, thresholds):
+        return [
+            price is None or price >= thresholds.get(kind or "fixed", 0)
+            for price, kind in zip(max_prices, kinds)
+        ]
+
+    def evaluate(self, jobs):
+        """
+        Returns (kept, dropped) for a batch of jobs. Kept jobs get a "score" field.
+        """
+        if not jobs:
+            return [], []
+        titles = [unicodedata.normalize("NFKC", job.get("title") or "").lower() for job in jobs]
+        dtypes = [job.get("dtype") for job in jobs]
+        kinds = [job.get("price_kind") for job in jobs]
+        max_prices = [job.get("price_max") if job.get("price_max") is not None else job.get("price_min")
+                      for job in jobs]
+
+        keep = [True] * len(jobs)
+        if self.categories:
+            keep = [k and dtype in self.categories for k, dtype in zip(keep, dtypes)]
+        if self.exclude:
+            keep = [k and not self.exclude.search(title) for k, title in zip(keep, titles)]
+        if self.require:
+            keep = [k and bool(self.require.search(title)) for k, title in zip(keep, titles)]
+        if self.min_budget:
+            keep = [k and ok for k, ok in zip(keep, self._budget_ok(max_prices, kinds, self.min_budget))]
+
+        scores = [0.0] * len(jobs)
+        for rule in self.scores:
+            hits = keep
+            if rule["keywords"]:
+                hits = [h and bool(rule["keywords"].search(title)) for h, title in zip(hits, titles)]
+            if rule["categories"]:
+                hits = [h and dtype in rule["categories"] for h, dtype in zip(hits, dtypes)]
+            if rule["kind"]:
+                hits = [h and kind == rule["kind"] for h, kind in zip(hits, kinds)]
+            if rule["min_budget"] is not None:
+                hits = [h and price is not None and price >= rule["min_budget"] for h, price in zip(hits, max_prices)]
+            scores = [s + rule["score"] if h else s for s, h in zip(scores, hits)]
+        if self.min_score is not None:
+            keep = [k and s >= self.min_score for k, s in zip(keep, scores)]
+
+        kept, dropped = [], []
+        for job, k, score in zip(jobs, keep, scores):
+            if k:
+                kept.append(dict(job, score=score))
+            else:
+                dropped.append(job)
+        return kept, dropped
+
+
+_engine = None
+_engine_mtime = None
+_engine_lock = threading.Lock()
+
+
+def get_rules(path=RULES_FILE) -> RuleEngine:
+    """
+    The rule engine for RULES_FILE, reloaded whenever the file changes.
+    """
+    global _engine, _engine_mtime
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _engine_lock:
+        if _engine is None or mtime != _engine_mtime:
+            try:
+                _engine = RuleEngine.load(path)
+                if mtime is not None:
+                    logging.info(f"📏 Loaded job rules from {path}")
+            except (OSError, ValueError) as e:
+                logging.error(f"⚠️ Could not load rules from {path}: {e}")
+                _engine = _engine or RuleEngine()
+            _engine_mtime = mtime
+        return _engine
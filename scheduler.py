@@ -0,0 +1,155 @@
+# scheduler.py
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def scheduler_config_from_env():
+    """
+    Polling bounds in seconds, configurable from .env
+    """
+    return {
+        "min_interval": float(os.getenv("POLL_MIN_INTERVAL", "30")),
+        "max_interval": float(os.getenv("POLL_MAX_INTERVAL", "600")),
+        "base_interval": float(os.getenv("POLL_BASE_INTERVAL", "60")),
+        # Aim for about this many new jobs per poll on every source
+        "target_per_poll": float(os.getenv("POLL_TARGET_NEW_JOBS", "1")),
+        "jitter": float(os.getenv("POLL_JITTER", "0.1")),
+    }
+
+
+class SourceSchedule:
+    """
+    Polling state of one source.
+    """
+
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self.next_run = 0.0
+        self.last_run = None
+        self.rate = None  # EWMA of new jobs per second
+        self.errors = 0
+        self.running = False
+
+
+class AdaptiveScheduler:
+    """
+    Polls every source on its own interval.
+
+    After each run the observed posting rate (new jobs per second, smoothed) is turned into
+    the interval that would yield about `target_per_poll` new jobs per poll, clamped to
+    [min_interval, max_interval]. Sources that keep finding nothing drift towards the max
+    interval, busy ones towards the min. Failing sources back off exponentially, and every
+    next run gets a random jitter so sources do not fire in lockstep.
+
+    If `budget_for(name)` returns a HostBudget, a due source only starts when its host
+    has concurrency and rate budget left; otherwise it waits for the next tick.
+    """
+
+    def __init__(self, run_source, sources, max_workers, config=None, smoothing=0.3, budget_for=None):
+        self.run_source = run_source
+        self.budget_for = budget_for
+        self.config = dict(config or scheduler_config_from_env())
+        self.smoothing = smoothing
+        self.sources = {name: SourceSchedule(name, self.config["base_interval"]) for name in sources}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="source")
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def _clamp(self, interval):
+        return max(self.config["min_interval"], min(self.config["max_interval"], interval))
+
+    def _jittered(self, interval):
+        jitter = self.config["jitter"]
+        return interval * random.uniform(1 - jitter, 1 + jitter)
+
+    def record(self, name, new_jobs, now=None):
+        """
+        Updates a source's interval after a run. `new_jobs` is None when the run failed.
+        """
+        now = now or time.time()
+        with self._lock:
+            state = self.sources.get(name)
+            if state is None:
+                return  # removed from this scheduler while it was running
+            if new_jobs is None:
+                state.errors += 1
+                state.interval = self._clamp(self.config["base_interval"] * 2 ** state.errors)
+                logging.warning(f"⏳ {name} failed {state.errors}x, next poll in {state.interval:.0f}s")
+            else:
+                state.errors = 0
+                if state.last_run is not None:
+                    elapsed = max(1.0, now - state.last_run)
+                    observed = new_jobs / elapsed
+                    state.rate = observed if state.rate is None else (
+                        self.smoothing * observed + (1 - self.smoothing) * state.rate
+                    )
+                    if state.rate > 0:
+                        desired = self.config["target_per_poll"] / state.rate
+                    else:
+                        desired = state.interval * 1.5
+                    # Move halfway towards the desired interval to avoid oscillating
+                    state.interval = self._clamp((state.interval + desired) / 2)
+                state.last_run = now
+            state.next_run = now + self._jittered(state.interval)
+            state.running = False
+
+    def _run(self, name, budget=None):
+        try:
+            new_jobs = self.run_source(name)
+        except Exception as e:
+            logging.error(f"❌ Error checking {name}: {e}")
+            new_jobs = None
+        finally:
+            if budget:
+                budget.release()
+        self.record(name, new_jobs)
+
+    def set_sources(self, names):
+        """
+        Replaces the set of polled sources, keeping the state of the ones that stay.
+        Returns (added, removed). A removed source that is running finishes its poll.
+        """
+        names = set(names)
+        with self._lock:
+            added = names - set(self.sources)
+            removed = set(self.sources) - names
+            for name in removed:
+                del self.sources[name]
+            for name in added:
+                self.sources[name] = SourceSchedule(name, self.config["base_interval"])
+        return added, removed
+
+    def intervals(self):
+        with self._lock:
+            return {name: state.interval for name, state in self.sources.items()}
+
+    def run_forever(self, tick=1.0):
+        """
+        Dispatches due sources until stop() is called. Sources run independently, a slow
+        one only delays itself.
+        """
+        while not self._stopping.is_set():
+            now = time.time()
+            started = []
+            with self._lock:
+                # Most overdue first, so a tight host budget is shared fairly
+                due = sorted((s for s in self.sources.values() if not s.running and s.next_run <= now),
+                             key=lambda s: s.next_run)
+                for state in due:
+                    budget = self.budget_for(state.name) if self.budget_for else None
+                    if budget and not budget.try_acquire():
+                        continue
+                    state.running = True
+                    started.append((state.name, budget))
+            for name, budget in started:
+                self._executor.submit(self._run, name, budget)
+            self._stopping.wait(tick)
+
+    def stop(self):
+        self._stopping.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
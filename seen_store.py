@@ -0,0 +1,155 @@
+# seen_store.py
+import os
+import json
+import sqlite3
+import logging
+import threading
+
+SEEN_DB_FILE = os.getenv("SEEN_DB_FILE", "seen.db")
+LEGACY_SEEN_FILE = "seen.json"
+
+
+def site_of(dtype: str) -> str:
+    """
+    Returns the namespace for a source, e.g. "Lancers_web" -> "lancers", "CW_AI" -> "cw".
+    Ids from different sites live in separate namespaces so they can never collide.
+    """
+    return dtype.split("_", 1)[0].lower()
+
+
+class SeenStore:
+    """
+    Persistent store of already-notified jobs keyed by (site, id).
+
+    Rows are only ever inserted, never rewritten, and all keys are also held in an
+    in-memory set so membership checks are O(1) and never touch the disk.
+    """
+
+    def __init__(self, path=SEEN_DB_FILE, legacy_file=LEGACY_SEEN_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS seen (
+                site  TEXT NOT NULL,
+                id    TEXT NOT NULL,
+                time  TEXT,
+                dtype TEXT,
+                type  TEXT,
+                title TEXT,
+                url   TEXT,
+                price TEXT,
+                PRIMARY KEY (site, id)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+                dtype TEXT PRIMARY KEY,
+                id    TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._keys = set(self._conn.execute("SELECT site, id FROM seen"))
+        self._watermarks = dict(self._conn.execute("SELECT dtype, id FROM watermarks"))
+
+        if legacy_file and os.path.exists(legacy_file):
+            self.import_json(legacy_file)
+
+    def import_json(self, json_file):
+        """
+        Imports the entries of an old seen.json list and renames the file so the
+        import only happens once.
+        """
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logging.error(f"⚠️ Could not read {json_file} for import: {e}")
+            data = []
+
+        imported = self.add_many(data)
+        logging.info(f"📥 Imported {imported} jobs from {json_file} into {self.path}")
+        os.replace(json_file, json_file + ".imported")
+        return imported
+
+    def __contains__(self, key):
+        dtype, jid = key
+        return (site_of(dtype), str(jid)) in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contains(self, dtype, jid) -> bool:
+        return (dtype, jid) in self
+
+    def get_watermark(self, dtype):
+        """
+        Returns the newest job id seen so far for a source, or None.
+        """
+        return self._watermarks.get(dtype)
+
+    def update_watermark(self, dtype, jobs):
+        """
+        Raises the source watermark to the newest id among the given jobs.
+        """
+        ids = [int(job["id"]) for job in jobs if str(job["id"]).isdigit()]
+        current = self._watermarks.get(dtype)
+        newest = max(ids + ([int(current)] if current else []), default=None)
+        if newest is None or str(newest) == current:
+            return
+        with self._lock:
+            self._watermarks[dtype] = str(newest)
+            self._conn.execute("INSERT OR REPLACE INTO watermarks (dtype, id) VALUES (?, ?)", (dtype, str(newest)))
+            self._conn.commit()
+
+    def is_known(self, dtype, jid) -> bool:
+        """
+        True if the job was already seen or is not newer than the source watermark.
+        Used by the scrapers to stop paging through newest-first results.
+        """
+        if (dtype, jid) in self:
+            return True
+        watermark = self._watermarks.get(dtype)
+        return bool(watermark) and str(jid).isdigit() and int(jid) <= int(watermark)
+
+    def add(self, job) -> bool:
+        """
+        Records a single job dict. Returns False if it was already known.
+        """
+        return self.add_many([job]) == 1
+
+    def add_many(self, jobs) -> int:
+        """
+        Records a batch of job dicts in one transaction. Returns how many were new.
+        """
+        rows = []
+        with self._lock:
+            for job in jobs:
+                dtype = job.get("dtype", "")
+                key = (site_of(dtype), str(job["id"]))
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                rows.append((
+                    key[0], key[1],
+                    job.get("time"), dtype, job.get("type"),
+                    job.get("title"), job.get("url"), job.get("price"),
+                ))
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO seen (site, id, time, dtype, type, title, url, price) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
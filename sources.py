@@ -0,0 +1,247 @@
+# sources.py
+import os
+import time
+import threading
+from browser import (get_lancers_jobs, get_cw_jobs, get_cw_jobs_http, get_description, login, open_bid_form,
+                     send_bid)
+from http_fetch import cw_fetch_mode
+from supervisor import restore_lancers_login, save_lancers_cookies
+import metrics
+
+
+class HostBudget:
+    """
+    Per-host limits: at most `max_concurrency` polls in flight and on average no more
+    than `requests_per_minute` page loads (token bucket, bursts up to the concurrency).
+    A `requests_per_minute` of 0 or less means no rate limit.
+
+    The scheduler only starts a poll when a slot and a token are free (try_acquire), and
+    every page load on the host takes a token first (take), waiting for one if the host
+    is busy.
+    """
+
+    def __init__(self, host, max_concurrency, requests_per_minute):
+        self.host = host
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(self.max_concurrency)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """
+        Reserves a poll slot if one is free and a request could start right away.
+        The poll's requests then take their tokens themselves.
+        """
+        with self._lock:
+            self._refill()
+            if self._in_flight >= self.max_concurrency or self._tokens < 1:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+    def take(self):
+        """
+        Takes a token for one request to the host, waiting until one is available.
+        """
+        if self.rate <= 0:
+            return
+        waited = False
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                wait = (1 - self._tokens) / self.rate
+            waited = True
+            time.sleep(wait)
+        if waited:
+            metrics.incr("budget_waits", self.host)
+
+
+class SourceAdapter:
+    """
+    A job board. Subclasses declare the search pages to watch (`urls`, dtype -> URL),
+    how to fetch them (`fetch_modes`, tried in order) and the per-host budgets, and
+    implement the matching fetch methods. Both fetch methods take the crawl options from
+    bot.crawl_options and return a list of job dicts, or None if the page could not be
+    fetched (the next fetch mode is then tried).
+
+    Adapters with `detail_sessions` > 0 also implement fetch_detail, which the prefetcher
+    runs on browser sessions of their own (`detail_site`), separate from the listing ones.
+    Adapters with `bid_sessions` > 0 implement open_bid_form and send_bid, which the
+    bidder runs on warm, logged-in sessions of their own (`bid_site`).
+    """
+
+    name = ""  # namespace of job ids and browser sessions, e.g. "lancers"
+    host = ""
+    urls = {}
+    fetch_modes = ("browser",)
+    max_concurrency = 1
+    requests_per_minute = 30
+    detail_sessions = 0
+    bid_sessions = 0
+
+    def __init__(self):
+        self.budget = HostBudget(self.host, self.max_concurrency, self.requests_per_minute)
+
+    @property
+    def detail_site(self):
+        return f"{self.name}_detail"
+
+    @property
+    def bid_site(self):
+        return f"{self.name}_bid"
+
+    def prepare_session(self, driver):
+        """
+        Called once for every new browser session of this site (e.g. to log in).
+        """
+
+    def fetch_browser(self, driver, url, dtype, **crawl):
+        raise NotImplementedError
+
+    def fetch_http(self, url, dtype, **crawl):
+        raise NotImplementedError
+
+    def fetch_detail(self, driver, job, timeout):
+        """
+        Returns {"description", "apply_url"} of a job's detail page.
+        """
+        raise NotImplementedError
+
+    def open_bid_form(self, driver, apply_url, timeout):
+        """
+        Loads a job's proposal form and returns once it can be filled in.
+        """
+        raise NotImplementedError
+
+    def send_bid(self, driver, proposal, submit=True):
+        """
+        Fills in and, unless submit is False, submits the proposal form opened by open_bid_form.
+        """
+        raise NotImplementedError
+
+
+class LancersSource(SourceAdapter):
+    name = "lancers"
+    host = "www.lancers.jp"
+    urls = {
+        "Lancers_web":    "https://www.lancers.jp/work/search/web?open=1",
+        "Lancers_system": "https://www.lancers.jp/work/search/system?open=1",
+        "Lancers_AI":     "https://www.lancers.jp/work/search/system/ai?open=1",
+        "Lancers_Android": "https://www.lancers.jp/work/search/system/smartphoneapp?open=1"
+    }
+    fetch_modes = ("browser",)
+
+    def __init__(self):
+        self.max_concurrency = max(1, int(os.getenv("SCRAPE_SESSIONS_LANCERS", "2")))
+        self.requests_per_minute = float(os.getenv("LANCERS_REQUESTS_PER_MINUTE", "20"))
+        self.detail_sessions = max(0, int(os.getenv("DETAIL_SESSIONS_LANCERS", "1")))
+        # Bidding is off unless tabs are reserved for it
+        self.bid_sessions = max(0, int(os.getenv("BID_SESSIONS_LANCERS", "0")))
+        super().__init__()
+
+    def prepare_session(self, driver):
+        if not restore_lancers_login(driver):
+            login(driver, os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASS"))
+            save_lancers_cookies(driver)
+
+    def fetch_browser(self, driver, url, dtype, **crawl):
+        return get_lancers_jobs(driver, url, dtype, **crawl)
+
+    def fetch_detail(self, driver, job, timeout):
+        return get_description(driver, job["url"], timeout)
+
+    def open_bid_form(self, driver, apply_url, timeout):
+        open_bid_form(driver, apply_url, timeout)
+
+    def send_bid(self, driver, proposal, submit=True):
+        send_bid(driver, proposal, submit)
+
+
+class CrowdworksSource(SourceAdapter):
+    name = "cw"
+    host = "crowdworks.jp"
+    urls = {
+        "CW_web": "https://crowdworks.jp/public/jobs/search?category_id=230&order=new",
+        "CW_system": "https://crowdworks.jp/public/jobs/search?category_id=226&order=new",
+        "CW_AI": "https://crowdworks.jp/public/jobs/search?category_id=311&order=new",
+        "CW_Android": "https://crowdworks.jp/public/jobs/search?category_id=242&order=new"
+    }
+
+    def __init__(self):
+        # Browserless first, Chrome as the fallback (CW_FETCH_MODE=browser skips HTTP)
+        self.fetch_modes = ("http", "browser") if cw_fetch_mode() == "http" else ("browser",)
+        self.max_concurrency = max(1, int(os.getenv("SCRAPE_SESSIONS_CW", "2")))
+        self.requests_per_minute = float(os.getenv("CW_REQUESTS_PER_MINUTE", "30"))
+        super().__init__()
+
+    def fetch_browser(self, driver, url, dtype, **crawl):
+        return get_cw_jobs(driver, url, dtype, **crawl)
+
+    def fetch_http(self, url, dtype, **crawl):
+        return get_cw_jobs_http(url, dtype, **crawl)
+
+
+REGISTRY = {}  # name -> adapter
+_registry_lock = threading.Lock()
+
+
+def register(adapter):
+    """
+    Adds a source adapter instance to the registry and returns it.
+    """
+    with _registry_lock:
+        REGISTRY[adapter.name] = adapter
+    return adapter
+
+
+def adapters():
+    if not REGISTRY:
+        register(LancersSource())
+        register(CrowdworksSource())
+    return list(REGISTRY.values())
+
+
+def all_sources():
+    """
+    Returns {dtype: adapter} for every watched search page.
+    """
+    return {dtype: adapter for adapter in adapters() for dtype in adapter.urls}
+
+
+def adapter_for(dtype):
+    return all_sources()[dtype]
+
+
+def adapter_for_site(site):
+    """
+    The adapter owning a DriverPool site, e.g. "lancers", "lancers_detail" or "lancers_bid".
+    """
+    for adapter in adapters():
+        if site in (adapter.name, adapter.detail_site, adapter.bid_site):
+            return adapter
+    raise KeyError(site)
+
+
+def session_limits():
+    """
+    Browser sessions per site for the DriverPool, from the adapters that use Chrome.
+    """
+    limits = {adapter.name: adapter.max_concurrency for adapter in adapters() if "browser" in adapter.fetch_modes}
+    limits.update({adapter.detail_site: adapter.detail_sessions for adapter in adapters() if adapter.detail_sessions})
+    limits.update({adapter.bid_site: adapter.bid_sessions for adapter in adapters() if adapter.bid_sessions})
+    return limits
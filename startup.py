@@ -0,0 +1,80 @@
+# startup.py
+import time
+import logging
+import importlib
+import threading
+
+# Imported first by bot.py, so this is (almost) the moment the interpreter started on our code
+STARTED = time.perf_counter()
+
+_lock = threading.Lock()
+_phases = []  # (name, seconds), in the order they finished
+_last = STARTED
+_reported = False
+
+
+def mark(name):
+    """
+    Records the time since the previous mark as startup phase `name`.
+    """
+    global _last
+    now = time.perf_counter()
+    with _lock:
+        _phases.append((name, now - _last))
+        _last = now
+
+
+def record(name, seconds):
+    """
+    Records a phase that ran in the background, next to the critical path.
+    """
+    with _lock:
+        _phases.append((name, seconds))
+
+
+def preload(modules, name="sink imports"):
+    """
+    Imports modules on a background thread (e.g. the Slack / Sheets / translation sinks
+    while Chrome starts). Returns a function that waits for the imports and re-raises
+    any error, so configuration problems still stop the bot at startup.
+    """
+    errors = []
+
+    def run():
+        start = time.perf_counter()
+        timings = []
+        for module in modules:
+            t = time.perf_counter()
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                errors.append(e)
+                return
+            timings.append(f"{module} {time.perf_counter() - t:.2f}s")
+        record(f"{name} [background: {', '.join(timings)}]", time.perf_counter() - start)
+
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+
+    def wait():
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    return wait
+
+
+def report(name="first cycle"):
+    """
+    Marks the end of startup and prints the timing breakdown once.
+    """
+    global _reported
+    with _lock:
+        if _reported:
+            return
+        _reported = True
+    mark(name)
+    total = time.perf_counter() - STARTED
+    with _lock:
+        breakdown = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in _phases)
+    logging.info(f"⏱️ Startup {total:.2f}s: {breakdown}")
@@ -0,0 +1,99 @@
+# supervisor.py
+import os
+import json
+import logging
+import threading
+
+LANCERS_COOKIES_FILE = os.getenv("LANCERS_COOKIES_FILE", "lancers_cookies.json")
+LANCERS_HOME = "https://www.lancers.jp/"
+LANCERS_MYPAGE = "https://www.lancers.jp/mypage"
+
+
+def profile_dir(site, slot):
+    """
+    Persistent Chrome user-data-dir for a pool slot, or None if CHROME_PROFILE_ROOT is empty.
+    Every concurrent session needs its own directory because Chrome locks a profile.
+    """
+    root = os.getenv("CHROME_PROFILE_ROOT", "chrome_profiles")
+    if not root:
+        return None
+    return os.path.abspath(os.path.join(root, f"{site}-{slot}"))
+
+
+def is_healthy(driver, timeout=15) -> bool:
+    """
+    True if the browser still answers a trivial script within `timeout` seconds.
+    The check runs in a helper thread so a hung chromedriver cannot block the caller.
+    """
+    result = []
+
+    def probe():
+        try:
+            result.append(driver.execute_script("return 1") == 1)
+        except Exception:
+            result.append(False)
+
+    thread = threading.Thread(target=probe, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return bool(result and result[0])
+
+
+def quit_quietly(driver):
+    """
+    Quits a (possibly dead) driver in the background so a hung browser cannot block us.
+    """
+    def close():
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.debug(f"Ignoring error while closing dead browser: {e}")
+
+    threading.Thread(target=close, daemon=True).start()
+
+
+def save_lancers_cookies(driver, path=LANCERS_COOKIES_FILE):
+    try:
+        cookies = driver.get_cookies()
+    except Exception as e:
+        logging.error(f"⚠️ Could not read Lancers cookies: {e}")
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cookies, f)
+    os.replace(tmp, path)
+
+
+def restore_lancers_login(driver, path=LANCERS_COOKIES_FILE) -> bool:
+    """
+    Tries to resume a Lancers session, from the persistent profile or the saved cookies,
+    without going through the login form. Returns True if we ended up logged in.
+    """
+    driver.get(LANCERS_MYPAGE)
+    if driver.current_url.startswith(LANCERS_MYPAGE):
+        logging.info("✅ Lancers session restored from browser profile.")
+        return True
+
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cookies = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.error(f"⚠️ Could not read {path}: {e}")
+        return False
+
+    driver.get(LANCERS_HOME)
+    for cookie in cookies:
+        cookie.pop("sameSite", None)  # older chromedrivers reject some values
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            continue
+
+    driver.get(LANCERS_MYPAGE)
+    if driver.current_url.startswith(LANCERS_MYPAGE):
+        logging.info("✅ Lancers session restored from saved cookies.")
+        return True
+    logging.warning("⚠️ Saved Lancers cookies expired, logging in again.")
+    return False
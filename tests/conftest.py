@@ -0,0 +1,8 @@
+# conftest.py
+import os
+import sys
+
+# The modules live at the repository root, next to bot.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# notifySlack refuses to import without a webhook, tests never post to it
+os.environ.setdefault("SLACK_WEBHOOK_URL", "http://127.0.0.1:9/hooks/test")
@@ -0,0 +1,65 @@
+# test_browser.py
+from browser import crawl_pages, page_url, parse_yen
+
+
+def fake_site(pages):
+    """
+    fetch_page over {page number: [job ids]}, recording the pages it was asked for.
+    """
+    requested = []
+
+    def fetch_page(url, dtype):
+        page = int(url.split("page=")[1]) if "page=" in url else 1
+        requested.append(page)
+        ids = pages.get(page)
+        return None if ids is None else [{"id": str(jid), "dtype": dtype} for jid in ids]
+
+    return fetch_page, requested
+
+
+def test_page_url():
+    assert page_url("https://example.com/search?a=1", 1) == "https://example.com/search?a=1"
+    assert page_url("https://example.com/search?a=1&page=3", 2) == "https://example.com/search?a=1&page=2"
+
+
+def test_crawl_stops_at_the_first_page_with_a_known_job():
+    fetch_page, requested = fake_site({1: [30, 29, 28], 2: [27, 26, 25], 3: [24, 23, 22]})
+    jobs = crawl_pages(fetch_page, "https://example.com/search", "CW_web", known=lambda jid: int(jid) <= 26,
+                       max_pages=5)
+    assert requested == [1, 2]
+    assert [job["id"] for job in jobs] == ["30", "29", "28", "27", "26", "25"]
+
+
+def test_crawl_respects_max_pages_and_throttle():
+    fetch_page, requested = fake_site({page: [100 - page] for page in range(1, 10)})
+    throttled = []
+    crawl_pages(fetch_page, "https://example.com/search", "CW_web", known=lambda jid: False, max_pages=3,
+                throttle=lambda: throttled.append(1))
+    assert requested == [1, 2, 3]
+    assert len(throttled) == 3
+
+
+def test_crawl_without_known_reads_one_page():
+    fetch_page, requested = fake_site({1: [3], 2: [2]})
+    assert len(crawl_pages(fetch_page, "https://example.com/search", "CW_web", max_pages=5)) == 1
+    assert requested == [1]
+
+
+def test_crawl_failures_and_unchanged_listing():
+    fetch_page, _ = fake_site({})
+    assert crawl_pages(fetch_page, "https://example.com/search", "CW_web") is None
+
+    fetch_page, requested = fake_site({1: [5, 4]})
+    jobs = crawl_pages(fetch_page, "https://example.com/search", "CW_web", known=lambda jid: False, max_pages=3)
+    assert [job["id"] for job in jobs] == ["5", "4"]  # page 2 failed, page 1 is kept
+
+    fetch_page, _ = fake_site({1: [5, 4]})
+    assert crawl_pages(fetch_page, "https://example.com/search", "CW_web", changed=lambda jobs: False) == []
+
+
+def test_parse_yen():
+    assert parse_yen("10,000") == 10000
+    assert parse_yen("¥ 1,500 / 時間") == 1500
+    assert parse_yen("相談") is None
+    assert parse_yen(None) is None
+    assert parse_yen(3000) == 3000
@@ -0,0 +1,27 @@
+# test_change_detect.py
+from change_detect import ListingFingerprints, listing_fingerprint
+
+
+def jobs(*ids):
+    return [{"id": jid} for jid in ids]
+
+
+def test_fingerprint_depends_on_ids_and_order():
+    assert listing_fingerprint(jobs("1", "2")) == listing_fingerprint(jobs("1", "2"))
+    assert listing_fingerprint(jobs("1", "2")) != listing_fingerprint(jobs("2", "1"))
+
+
+def test_unchanged_listing_is_reported_once_per_repeat():
+    fingerprints = ListingFingerprints()
+    assert fingerprints.changed("CW_web", jobs("1", "2"))
+    assert not fingerprints.changed("CW_web", jobs("1", "2"))
+    assert fingerprints.changed("CW_AI", jobs("1", "2"))  # tracked per source
+    assert fingerprints.changed("CW_web", jobs("3", "1", "2"))
+
+
+def test_forget_makes_the_next_poll_read_the_listing():
+    fingerprints = ListingFingerprints()
+    fingerprints.changed("CW_web", jobs("1"))
+    fingerprints.forget("CW_web")
+    assert fingerprints.changed("CW_web", jobs("1"))
+    fingerprints.forget("unknown")
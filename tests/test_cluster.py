@@ -0,0 +1,33 @@
+# test_cluster.py
+from cluster import RemoteSeen, assign_sources
+
+SOURCES = [f"source_{i}" for i in range(12)]
+
+
+def test_every_source_is_assigned_once_by_capacity():
+    assignment = assign_sources(SOURCES, {"a": 1, "b": 1, "c": 2})
+    assert sorted(dtype for dtypes in assignment.values() for dtype in dtypes) == sorted(SOURCES)
+    assert len(assignment["c"]) >= len(assignment["a"])
+    assert assign_sources(SOURCES, {}) == {}
+
+
+def test_assignment_is_stable():
+    workers = {"a": 1, "b": 1, "c": 1}
+    assert assign_sources(SOURCES, workers) == assign_sources(list(reversed(SOURCES)), dict(workers))
+
+
+def test_few_sources_move_when_a_worker_joins():
+    before = assign_sources(SOURCES, {"a": 1, "b": 1, "c": 1})
+    after = assign_sources(SOURCES, {"a": 1, "b": 1, "c": 1, "d": 1})
+    owner = {dtype: worker for worker, dtypes in before.items() for dtype in dtypes}
+    moved = [dtype for worker, dtypes in after.items() for dtype in dtypes if owner[dtype] != worker]
+    assert len(moved) <= len(after["d"]) + 2
+
+
+def test_remote_seen_is_bounded():
+    seen = RemoteSeen(history=3)
+    seen.mark_reported("CW_web", [{"id": str(i)} for i in range(5)])
+    assert seen.is_known("CW_web", "4")
+    assert not seen.is_known("CW_web", "0")
+    seen.set_watermarks({"CW_web": "2"})
+    assert seen.is_known("CW_web", "0")
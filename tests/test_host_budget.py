@@ -0,0 +1,32 @@
+# test_host_budget.py
+import time
+from sources import HostBudget
+
+
+def test_concurrency_limit():
+    budget = HostBudget("example.com", max_concurrency=2, requests_per_minute=0)
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    budget.release()
+    assert budget.try_acquire()
+
+
+def test_zero_rate_means_no_limit():
+    budget = HostBudget("example.com", max_concurrency=1, requests_per_minute=0)
+    started = time.monotonic()
+    for _ in range(100):
+        budget.take()
+    assert time.monotonic() - started < 0.5
+
+
+def test_tokens_run_out_and_refill():
+    budget = HostBudget("example.com", max_concurrency=2, requests_per_minute=600)  # one token per 0.1s
+    budget.take()
+    budget.take()
+    assert not budget.try_acquire()  # no token left for a new poll
+    started = time.monotonic()
+    budget.take()
+    assert time.monotonic() - started >= 0.05
+    time.sleep(0.15)
+    assert budget.try_acquire()
@@ -0,0 +1,66 @@
+# test_near_dup.py
+import time
+import pytest
+import near_dup
+from near_dup import NearDuplicateIndex, normalize_price, prices_match
+
+TITLE = "【急募】Pythonでスクレイピングツールの開発をお願いします"
+
+
+def job(jid, dtype, title=TITLE, price="10,000 ~ 50,000"):
+    return {"id": jid, "dtype": dtype, "title": title, "price": price, "url": f"https://example.com/{dtype}/{jid}"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(path=str(tmp_path / "near_dup.db"), history=100, window=3600)
+    yield index
+    index.close()
+
+
+def test_prices():
+    assert normalize_price("10,000 ~ 50,000") == (10000, 50000)
+    assert prices_match(normalize_price("10000〜50000円"), normalize_price("10,000 ~ 50,000"))
+    assert not prices_match((), ())
+
+
+def test_cross_posted_copy_is_found(index):
+    key = index.add(job("1", "Lancers_web"))
+    assert index.find(job("2", "CW_web", title="★初心者歓迎★Pythonでスクレイピングツールの開発をお願いします")) == key
+    assert index.describe(key) == {"dtype": "Lancers_web", "url": "https://example.com/Lancers_web/1"}
+    assert index.find(job("3", "CW_web", title="ロゴデザインの作成")) is None
+
+
+def test_price_must_match(index):
+    index.add(job("1", "Lancers_web"))
+    assert index.find(job("2", "CW_web", price="5,000")) is None
+    assert index.find(job("3", "CW_web", price="相談")) is None
+
+
+def test_same_source_is_not_a_copy(index):
+    index.add(job("1", "Lancers_web"))
+    assert index.find(job("2", "Lancers_web")) is None
+
+
+def test_window(index, monkeypatch):
+    index.add(job("1", "Lancers_web"))
+    later = time.time() + 7200
+    monkeypatch.setattr(near_dup.time, "time", lambda: later)
+    assert index.find(job("2", "CW_web")) is None
+
+
+def test_eviction_also_on_disk(tmp_path):
+    path = str(tmp_path / "near_dup.db")
+    index = NearDuplicateIndex(path=path, history=2, window=3600)
+    old = index.add(job("1", "Lancers_web"))
+    index.add(job("2", "Lancers_web", title="ロゴデザインの作成"))
+    index.add(job("3", "Lancers_web", title="動画編集のお仕事"))
+    assert len(index) == 2
+    assert index.describe(old) is None
+    assert index.find(job("4", "CW_web")) is None
+    index.close()
+
+    reopened = NearDuplicateIndex(path=path, history=2, window=3600)
+    assert len(reopened) == 2
+    assert reopened.find(job("5", "CW_web", title="動画編集のお仕事")) == ("lancers", "3")
+    reopened.close()
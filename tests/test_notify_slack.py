@@ -0,0 +1,38 @@
+# test_notify_slack.py
+from notifySlack import build_payload, redact
+
+
+def job(jid, **fields):
+    return dict({"dtype": "CW_web", "price": "10,000円", "title": f"Job {jid}", "url": f"https://example.com/{jid}",
+                 "found_at": "2026-01-01 09:00:00"}, **fields)
+
+
+def test_single_job_is_plain_text():
+    payload = build_payload([job("1", description="説明 " * 200, apply_url="https://example.com/apply/1",
+                                 duplicates=[{"dtype": "Lancers_web", "url": "https://example.com/l/1"}])])
+    assert set(payload) == {"text"}
+    text = payload["text"]
+    assert text.startswith("2026-01-01 09:00:00 : <!channel>")
+    assert "*Apply:* https://example.com/apply/1" in text
+    assert "<https://example.com/l/1|Lancers_web>" in text
+    assert "…" in text  # description is cut to an excerpt
+
+
+def test_copy_of_an_earlier_job_has_no_channel_ping():
+    text = build_payload([job("2", copy_of={"dtype": "Lancers_web", "url": "https://example.com/l/2"})])["text"]
+    assert "<!channel>" not in text
+    assert "*Original:* <https://example.com/l/2|Lancers_web>" in text
+
+
+def test_burst_is_one_block_kit_message():
+    payload = build_payload([job(str(i)) for i in range(3)])
+    assert payload["text"].startswith("3 new jobs found")
+    sections = [block for block in payload["blocks"] if block["type"] == "section"]
+    assert len(sections) == 4
+    assert "<https://example.com/2|Job 2>" in sections[3]["text"]["text"]
+
+
+def test_redact_hides_the_webhook():
+    url = "https://hooks.slack.com/services/T0/B0/secret"
+    message = redact(f"Connection to {url} failed, path /services/T0/B0/secret", url)
+    assert "secret" not in message
@@ -0,0 +1,56 @@
+# test_rules.py
+from rules import RuleEngine
+
+
+def job(title, dtype="Lancers_web", price_max=None, kind="fixed"):
+    return {"id": title, "dtype": dtype, "title": title, "price_min": None, "price_max": price_max,
+            "price_kind": kind if price_max else None}
+
+
+def titles(jobs):
+    return [job["title"] for job in jobs]
+
+
+def test_no_rules_keeps_everything():
+    kept, dropped = RuleEngine().evaluate([job("a"), job("b")])
+    assert titles(kept) == ["a", "b"] and dropped == []
+    assert all(job["score"] == 0 for job in kept)
+
+
+def test_keywords_match_normalized_titles():
+    engine = RuleEngine({"exclude_keywords": ["データ入力"], "require_keywords": ["python", "AI"]})
+    kept, dropped = engine.evaluate([job("ＰＹＴＨＯＮでツール開発"), job("Pythonでデータ入力"), job("ロゴ作成"),
+                                     job("生成ai活用")])
+    assert titles(kept) == ["ＰＹＴＨＯＮでツール開発", "生成ai活用"]
+    assert titles(dropped) == ["Pythonでデータ入力", "ロゴ作成"]
+
+
+def test_categories_and_budget():
+    engine = RuleEngine({"categories": ["Lancers_web", "CW_web"], "min_budget": {"fixed": 30000, "hourly": 1500}})
+    kept, _ = engine.evaluate([
+        job("cheap", price_max=10000),
+        job("ok", price_max=50000),
+        job("hourly", price_max=2000, kind="hourly"),
+        job("discuss"),
+        job("other category", dtype="CW_AI", price_max=50000),
+    ])
+    assert titles(kept) == ["ok", "hourly", "discuss"]
+
+
+def test_scores_and_min_score():
+    engine = RuleEngine({
+        "scores": [
+            {"keywords": ["AI"], "score": 2},
+            {"min_budget": 100000, "kind": "fixed", "score": 1},
+            {"categories": ["CW_AI"], "score": 1},
+        ],
+        "min_score": 2,
+    })
+    kept, dropped = engine.evaluate([
+        job("AI chatbot", price_max=200000),
+        job("AI chatbot cheap", price_max=1000),
+        job("website", price_max=200000, dtype="CW_AI"),
+        job("website"),
+    ])
+    assert {job["title"]: job["score"] for job in kept} == {"AI chatbot": 3, "AI chatbot cheap": 2, "website": 2}
+    assert titles(dropped) == ["website"]
@@ -0,0 +1,53 @@
+# test_seen_store.py
+import json
+from seen_store import SeenStore, site_of
+
+
+def job(jid, dtype="Lancers_web"):
+    return {"id": jid, "dtype": dtype, "title": f"job {jid}", "url": f"https://example.com/{jid}", "price": "1,000"}
+
+
+def test_site_of():
+    assert site_of("Lancers_web") == "lancers"
+    assert site_of("CW_AI") == "cw"
+
+
+def test_import_json_renames_the_legacy_file(tmp_path):
+    legacy = tmp_path / "seen.json"
+    legacy.write_text(json.dumps([job("1"), job("2"), job("2")]), encoding="utf-8")
+    store = SeenStore(path=str(tmp_path / "seen.db"), legacy_file=str(legacy))
+    assert len(store) == 2
+    assert store.contains("Lancers_system", "1")  # same site, any category
+    assert not legacy.exists()
+    assert (tmp_path / "seen.json.imported").exists()
+    store.close()
+
+
+def test_add_claims_a_job_once_and_persists(tmp_path):
+    path = str(tmp_path / "seen.db")
+    store = SeenStore(path=path, legacy_file=None)
+    assert store.add(job("1"))
+    assert not store.add(job("1", "Lancers_system"))
+    assert store.add(job("1", "CW_web"))  # other site, other namespace
+    assert store.add_many([job("2"), job("3"), job("2")]) == 2
+    store.close()
+
+    reopened = SeenStore(path=path, legacy_file=None)
+    assert len(reopened) == 4
+    assert ("Lancers_web", 3) in reopened
+    reopened.close()
+
+
+def test_watermark_only_moves_up(tmp_path):
+    path = str(tmp_path / "seen.db")
+    store = SeenStore(path=path, legacy_file=None)
+    store.update_watermark("CW_web", [job("10", "CW_web"), job("12", "CW_web"), job("abc", "CW_web")])
+    store.update_watermark("CW_web", [job("11", "CW_web")])
+    assert store.get_watermark("CW_web") == "12"
+    assert store.is_known("CW_web", "9")
+    assert not store.is_known("CW_web", "13")
+    store.close()
+
+    reopened = SeenStore(path=path, legacy_file=None)
+    assert reopened.get_watermark("CW_web") == "12"
+    reopened.close()
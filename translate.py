@@ -1,11 +1,21 @@
 # translate.py
 import logging
 import os
-from dotenv import load_dotenv
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
 from deep_translator import GoogleTranslator, exceptions as dt_exceptions
+import metrics
+import eventlog
 
-load_dotenv()
-logging.basicConfig(level=logging.INFO)
+TRANSLATION_CACHE_FILE = os.getenv("TRANSLATION_CACHE_FILE", "translations.db")
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "20000"))
+
+# GoogleTranslator rejects payloads of 5000 characters or more
+MAX_BATCH_CHARS = 4500
+BATCH_SEPARATOR = "\n"
 
 def is_japanese_text(text: str) -> bool:
     if not text:
@@ -20,25 +30,151 @@ def is_japanese_text(text: str) -> bool:
             return True
     return False
 
+def normalize_text(text: str) -> str:
+    """
+    Cache key for a source text: NFKC-normalized with whitespace collapsed.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+class TranslationCache:
+    """
+    Size-bounded LRU cache of translations, persisted in SQLite.
+    """
+
+    def __init__(self, path=TRANSLATION_CACHE_FILE, max_size=TRANSLATION_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+        rows = self._conn.execute("SELECT key, value, used FROM translations ORDER BY used").fetchall()
+        self._entries = OrderedDict((key, value) for key, value, _ in rows)
+        self._clock = rows[-1][2] if rows else 0
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """
+        Returns {key: translation} for the cached keys, recording their use in one write.
+        """
+        found, rows = {}, []
+        with self._lock:
+            for key in keys:
+                if key in found or key not in self._entries:
+                    continue
+                self._entries.move_to_end(key)
+                self._clock += 1
+                found[key] = self._entries[key]
+                rows.append((self._clock, key))
+            if rows:
+                self._conn.executemany("UPDATE translations SET used = ? WHERE key = ?", rows)
+                self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            rows = []
+            for key, value in items.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                self._clock += 1
+                rows.append((key, value, self._clock))
+            self._conn.executemany("INSERT OR REPLACE INTO translations (key, value, used) VALUES (?, ?, ?)", rows)
+
+            evicted = []
+            while len(self._entries) > self.max_size:
+                evicted.append((self._entries.popitem(last=False)[0],))
+            if evicted:
+                self._conn.executemany("DELETE FROM translations WHERE key = ?", evicted)
+            self._conn.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> TranslationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache()
+        return _cache
+
+def _translate_uncached(texts):
+    """
+    Translates a list of texts with as few requests as possible by joining them with
+    newlines. Returns a dict of text -> translation for the texts that succeeded.
+    """
+    results = {}
+    translator = GoogleTranslator(source='ja', target='en')
+
+    # Split into chunks under the payload limit
+    chunks, chunk, size = [], [], 0
+    for text in texts:
+        if chunk and size + len(text) + 1 > MAX_BATCH_CHARS:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(text)
+        size += len(text) + 1
+    if chunk:
+        chunks.append(chunk)
+
+    for chunk in chunks:
+        try:
+            translated = translator.translate(BATCH_SEPARATOR.join(chunk))
+            lines = translated.split(BATCH_SEPARATOR) if translated else []
+            if len(lines) == len(chunk):
+                results.update({text: line.strip() for text, line in zip(chunk, lines)})
+                continue
+            # The translator merged or split lines, translate this chunk one by one instead
+            logging.info(f"Batch translation returned {len(lines)} lines for {len(chunk)} texts, retrying individually")
+            for text in chunk:
+                results[text] = translator.translate(text)
+        except dt_exceptions.NotValidPayload as e:
+            logging.error(f"Invalid input for translation: {e}")
+        except dt_exceptions.NotValidLength as e:
+            logging.error(f"Text too long to translate: {e}")
+        except dt_exceptions.LanguageNotSupportedException as e:
+            logging.error(f"Unsupported language: {e}")
+        except Exception as e:
+            logging.error(f"Translation error: {e}")
+    return results
+
+def translate_many(texts):
+    """
+    Translates a batch of texts to English. Non-Japanese texts are returned unchanged,
+    cached translations never touch the network and all cache misses are sent together.
+    Texts that fail to translate are returned as-is.
+    """
+    cache = get_cache()
+    keys = [normalize_text(text) if text and is_japanese_text(text) else None for text in texts]
+
+    found = cache.get_many(key for key in keys if key)
+
+    hits = len(found)
+    metrics.incr("translation_cache_hits", n=hits)
+    misses = list(dict.fromkeys(key for key in keys if key and key not in found))
+    if misses:
+        metrics.incr("translation_cache_misses", n=len(misses))
+        translated = _translate_uncached(misses)
+        if translated:
+            cache.put_many(translated)
+            found.update(translated)
+        eventlog.event("titles_translated", message=f"Translated {len(translated)}/{len(misses)} uncached titles "
+                       f"({hits} cache hits)", translated=len(translated), uncached=len(misses), cache_hits=hits)
+
+    return [found.get(key, text) if key else text for key, text in zip(keys, texts)]
+
 def translate_to_english(text: str) -> str:
     """
     Translate text to English if it contains Japanese.
     Otherwise, return original text.
     """
-    if not text or not is_japanese_text(text):
-        return text
-
-    try:
-        translation = GoogleTranslator(source='ja', target='en').translate(text)
-        logging.info(f"Translated '{text[:50]}...' to '{translation[:50]}...'")
-        return translation
-    except dt_exceptions.NotValidPayload as e:
-        logging.error(f"Invalid input for translation: {e}")
-    except dt_exceptions.NotValidLength as e:
-        logging.error(f"Text too long to translate: {e}")
-    except dt_exceptions.LanguageNotSupportedException as e:
-        logging.error(f"Unsupported language: {e}")
-    except Exception as e:
-        logging.error(f"Translation error: {e}")
-
-    return text
+    return translate_many([text])[0]
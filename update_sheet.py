@@ -1,57 +1,153 @@
 import gspread
 import os
-
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
+import json
+import logging
+import threading
+import metrics
+import eventlog
 
 # Google Sheets URL from .env
 GOOGLE_SHEET_URL = os.getenv("GOOGLE_SHEET_URL")
+CREDENTIALS_FILE = "service_account.json"
+
+SHEET_SPOOL_FILE = os.getenv("SHEET_SPOOL_FILE", "sheet_spool.jsonl")
+# Flush when this many rows are buffered or this many seconds have passed
+SHEET_FLUSH_ROWS = int(os.getenv("SHEET_FLUSH_ROWS", "20"))
+SHEET_FLUSH_SECONDS = float(os.getenv("SHEET_FLUSH_SECONDS", "30"))
+
+def job_to_row(job):
+    return [
+        job.get("time", ""),
+        job.get("dtype", ""),
+        job.get("url", ""),
+        job.get("price", ""),
+        job.get("title", ""),
+    ]
 
-def update_google_sheet(data):
+class SheetWriter:
     """
-    Updates the Google Sheet with the given data.
-    :param data: List of dictionaries containing job data.
+    Long-lived Google Sheets writer.
+
+    Authenticates once and keeps the worksheet handle. Rows are written to a local JSONL
+    spool first and a background thread flushes the spool with a single append_rows call
+    once SHEET_FLUSH_ROWS rows are waiting or SHEET_FLUSH_SECONDS have passed. If Sheets is
+    slow or down the rows simply stay in the spool and are replayed on the next flush, even
+    after a restart.
     """
-    try:
-        # Check if credentials file exists
-        credentials_file = "service_account.json"
-        if not os.path.exists(credentials_file):
-            print(f"❌ Credentials file '{credentials_file}' not found!")
-            return
 
-        # Check if Google Sheet URL is configured
-        if not GOOGLE_SHEET_URL:
-            print("❌ GOOGLE_SHEET_URL not found in environment variables!")
+    def __init__(self, sheet_url=GOOGLE_SHEET_URL, credentials_file=CREDENTIALS_FILE,
+                 spool_file=SHEET_SPOOL_FILE, flush_rows=SHEET_FLUSH_ROWS, flush_seconds=SHEET_FLUSH_SECONDS):
+        self.sheet_url = sheet_url
+        self.credentials_file = credentials_file
+        self.spool_file = spool_file
+        self.flush_rows = max(1, flush_rows)
+        self.flush_seconds = flush_seconds
+        self._sheet = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one append_rows in flight at a time
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._buffered = len(self._read_spool()[0])
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, jobs):
+        """
+        Queues job dicts for the sheet and returns immediately.
+        """
+        if not jobs:
             return
+        with self._lock:
+            with open(self.spool_file, "a", encoding="utf-8") as f:
+                for job in jobs:
+                    f.write(json.dumps(job_to_row(job), ensure_ascii=False) + "\n")
+            self._buffered += len(jobs)
+            if self._buffered >= self.flush_rows:
+                self._wakeup.set()
 
-        # Use modern gspread service_account method (simpler and recommended)
-        print("🔄 Authenticating with Google Sheets...")
-        client = gspread.service_account(filename=credentials_file)
+    def pending(self) -> int:
+        return self._buffered
 
-        # Open the Google Sheet
-        print("🔄 Opening Google Sheet...")
-        sheet = client.open_by_url(GOOGLE_SHEET_URL).sheet1
+    def stop(self, timeout=30):
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
 
-        # Prepare the data to append
+    def _worksheet(self):
+        if self._sheet is None:
+            if not os.path.exists(self.credentials_file):
+                raise FileNotFoundError(f"Credentials file '{self.credentials_file}' not found")
+            if not self.sheet_url:
+                raise ValueError("GOOGLE_SHEET_URL not found in environment variables")
+            client = gspread.service_account(filename=self.credentials_file)
+            self._sheet = client.open_by_url(self.sheet_url).sheet1
+            logging.info("✅ Connected to Google Sheet")
+        return self._sheet
+
+    def _read_spool(self):
+        """
+        Returns (rows, byte offset read up to).
+        """
+        if not os.path.exists(self.spool_file):
+            return [], 0
         rows = []
-        for job in data:
-            rows.append([
-                job.get("time", ""),
-                job.get("dtype", ""),
-                job.get("url", ""),
-                job.get("price", ""),
-                job.get("title", ""),
-            ])
-        print(f"Rows to append: {rows}")  # Debugging log
-
-        # Append rows to the sheet
-        if rows:
-            print("🔄 Appending rows to Google Sheet...")
-            sheet.append_rows(rows, value_input_option="USER_ENTERED")
-            print("✅ Data successfully sent to Google Sheets.")
-        else:
-            print("⚠️ No rows to append to Google Sheets.")
-
-    except Exception as e:
-        print(f"❌ Failed to update Google Sheets: {e}")
\ No newline at end of file
+        with open(self.spool_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            offset = f.tell()
+        return rows, offset
+
+    def _drop_spooled(self, offset, count):
+        """
+        Removes the first `offset` bytes (already sent) from the spool, keeping rows
+        appended while the flush was in flight.
+        """
+        with self._lock:
+            with open(self.spool_file, "r", encoding="utf-8") as f:
+                f.seek(offset)
+                rest = f.read()
+            tmp = self.spool_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(rest)
+            os.replace(tmp, self.spool_file)
+            self._buffered = max(0, self._buffered - count)
+
+    def flush(self) -> bool:
+        with self._flush_lock:
+            with self._lock:
+                rows, offset = self._read_spool()
+            if not rows:
+                return True
+            try:
+                with metrics.timer("sheet"):
+                    self._worksheet().append_rows(rows, value_input_option="USER_ENTERED")
+            except Exception as e:
+                self._sheet = None  # re-authenticate on the next attempt
+                logging.error(f"❌ Failed to update Google Sheets, {len(rows)} rows kept in {self.spool_file}: {e}")
+                return False
+            self._drop_spooled(offset, len(rows))
+            metrics.incr("sheet_rows", n=len(rows))
+            eventlog.event("sheet_rows_sent", message=f"✅ {len(rows)} rows sent to Google Sheets.", rows=len(rows))
+            return True
+
+    def _run(self):
+        delay = self.flush_seconds
+        while not self._stopping.is_set():
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+            # Back off while Sheets is failing, return to the normal interval once it recovers
+            delay = self.flush_seconds if self.flush() else min(delay * 2, 600)
+        self.flush()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_sheet_writer() -> SheetWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SheetWriter()
+        return _writer